@@ -0,0 +1,112 @@
+from columnar_store import load_dataset
+from itertools import compress
+import argparse
+
+INPUT_JSON = "updated_product_data.json"
+
+# Products and ingredients are bit positions in Python ints, which gives C-speed AND/OR over
+# the whole catalogue: `products_with[ingredient]` has bit p set when product p contains it.
+# Masks are built from and decoded to bytes in one go; setting or clearing bits one at a time
+# copies the whole int each time, which is quadratic on a large catalogue.
+_BITS = bytes.maketrans(b'01', b'\x00\x01')
+
+def mask_of(bits):
+    """Bitset with the given (ascending) bit positions set."""
+    buf = bytearray(bits[-1] // 8 + 1 if bits else 0)
+    for bit in bits:
+        buf[bit >> 3] |= 1 << (bit & 7)
+    return int.from_bytes(buf, 'little')
+
+class AllergyIndex:
+    """Answers "which products are safe for these allergies" with bitset operations.
+
+    Built once from a dataset dict; allergic relations are expanded transitively
+    at build time, so a query is one OR per allergen plus one AND NOT.
+    """
+
+    def __init__(self, data):
+        self.product_ids = [p['id'] for p in data['product']]
+        self.all_products = (1 << len(self.product_ids)) - 1
+        positions = {}  # ingredient id -> bits of the products containing it
+        for bit, product in enumerate(data['product']):
+            for ingredient_id in product['ingredient']:
+                positions.setdefault(ingredient_id, []).append(bit)
+        self.products_with = {ingredient_id: mask_of(bits) for ingredient_id, bits in positions.items()}
+        relations = {ing['id']: ing['allergic-relation'] or [] for ing in data['ingredient']}
+        self.related = {i: self._closure(i, relations) for i in relations}
+        self._unsafe_cache = {}
+
+    @staticmethod
+    def _closure(ingredient_id, relations):
+        """ingredient_id plus everything reachable through allergic-relation."""
+        seen = {ingredient_id}
+        stack = [ingredient_id]
+        while stack:
+            for other in relations.get(stack.pop(), ()):
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        return frozenset(seen)
+
+    def expand(self, allergic_ids):
+        """A user's allergies with every related ingredient added."""
+        expanded = set()
+        for ingredient_id in allergic_ids:
+            expanded |= self.related.get(ingredient_id, {ingredient_id})
+        return frozenset(expanded)
+
+    def unsafe_mask(self, allergic_ids):
+        """Bitset of the products containing any of the allergies (or their relations)."""
+        expanded = self.expand(allergic_ids)
+        mask = self._unsafe_cache.get(expanded)
+        if mask is None:
+            mask = 0
+            for ingredient_id in expanded:
+                mask |= self.products_with.get(ingredient_id, 0)
+            self._unsafe_cache[expanded] = mask
+        return mask
+
+    def safe_mask(self, allergic_ids):
+        return self.all_products & ~self.unsafe_mask(allergic_ids)
+
+    def ids_of(self, mask):
+        """Product ids of the bits set in mask."""
+        # bin() lists the bits high to low; reversed, byte i is 1 exactly when bit i is set
+        return list(compress(self.product_ids, bin(mask)[:1:-1].encode('ascii').translate(_BITS)))
+
+    def safe_products(self, allergic_ids):
+        """Ids of the products free of the allergies."""
+        return self.ids_of(self.safe_mask(allergic_ids))
+
+    def safe_products_batch(self, users):
+        """Map user id -> safe product ids for every user at once.
+
+        Users with the same expanded allergies share one computation, so the
+        cost grows with the number of distinct allergy profiles.
+        """
+        decoded = {}
+        result = {}
+        for user in users:
+            mask = self.safe_mask(user['allergic'])
+            if mask not in decoded:
+                decoded[mask] = self.ids_of(mask)
+            result[user['id']] = decoded[mask]
+        return result
+
+def main():
+    parser = argparse.ArgumentParser(description="List the products each user can safely use.")
+    parser.add_argument('--input', default=INPUT_JSON)
+    parser.add_argument('--user', type=int, help="only this user id")
+    args = parser.parse_args()
+
+    data = load_dataset(args.input)
+    index = AllergyIndex(data)
+    users = [u for u in data['user'] if args.user is None or u['id'] == args.user]
+    names = {p['id']: p['name'] for p in data['product']}
+    for user_id, product_ids in index.safe_products_batch(users).items():
+        print(f"👤 User {user_id}: {len(product_ids)}/{len(index.product_ids)} products safe")
+        for product_id in product_ids:
+            print(f"   ✅ {product_id}: {names[product_id]}")
+
+if __name__ == "__main__":
+    main()
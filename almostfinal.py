@@ -1,4 +1,6 @@
 from bs4 import BeautifulSoup
+from registry import DatasetRegistry
+from page_store import latest, load_page
 import json
 import re
 import os
@@ -13,15 +15,23 @@ def extract_bp_number(link):
     match = re.search(r'/p/BP_(\d+)', link)
     return match.group(1) if match else None
 
-def extract_ingredients_from_html(html_file):
-    """Extract ingredients from debug HTML after 'ส่วนประกอบ </h4><p class="ng-tns-c...'>'."""
-    if not os.path.exists(html_file):
-        print(f"Debug file not found: {html_file}")
+def load_html(product_code):
+    """The product's debug HTML, or its latest snapshot in the page store (where the scrapers save pages now)."""
+    html_file = f"debug_html/{DEBUG_PREFIX}{product_code}.html"
+    if os.path.exists(html_file):
+        with open(html_file, 'r', encoding='utf-8') as f:
+            return f.read()
+    entry = latest(product_code)
+    if entry:
+        return load_page(entry['digest'])
+    print(f"No saved page for {product_code}: neither {html_file} nor a page store snapshot")
+    return None
+
+def extract_ingredients_from_html(html):
+    """Extract ingredients from page HTML after 'ส่วนประกอบ </h4><p class="ng-tns-c...'>'."""
+    if html is None:
         return ""
     
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html = f.read()
-    
     soup = BeautifulSoup(html, 'html.parser')
     
     # Find the h4 with "ส่วนประกอบ"
@@ -90,6 +100,7 @@ with open(JSON_FILE, 'r', encoding='utf-8') as f:
 data['ingredient'] = []
 for product in data['product']:
     product['ingredient'] = []
+registry = DatasetRegistry(data)
 
 # Process each product
 for product in data['product']:
@@ -105,35 +116,14 @@ for product in data['product']:
             continue
         product_code = f"WTCTH-{bp_number}"
     
-    # Load debug HTML
-    html_file = f"debug_html/{DEBUG_PREFIX}{product_code}.html"
-    ingredient_text = extract_ingredients_from_html(html_file)
+    # Load the saved page
+    ingredient_text = extract_ingredients_from_html(load_html(product_code))
     
     # Parse ingredients
     parsed_ings = parse_ingredients(ingredient_text)
     
     # Map to IDs
-    ingredient_ids = []
-    for ing in parsed_ings:
-        ing_lower = ing.lower()
-        existing_id = None
-        for existing in data['ingredient']:
-            if existing['name'].lower() == ing_lower:
-                existing_id = existing['id']
-                break
-        
-        if existing_id:
-            ingredient_ids.append(existing_id)
-        else:
-            next_id = len(data['ingredient']) + 1
-            new_ing = {
-                'id': next_id,
-                'name': ing,
-                'allergic': False,
-                'allergic-relation': None
-            }
-            data['ingredient'].append(new_ing)
-            ingredient_ids.append(next_id)
+    ingredient_ids = registry.ingredient_ids(parsed_ings)
     
     product['ingredient'] = ingredient_ids
     print(f"Updated {len(ingredient_ids)} ingredients for {product['name']}")
@@ -1,11 +1,13 @@
 from playwright.sync_api import sync_playwright
-import time, os
+import time
+from browser_pool import open_context
 from datetime import datetime
 
 TARGET_URL = "https://shopee.co.th/POP-MART-CRYBABY-Wild-but-Cutie-Series-Vinyl-Plush-Pendant-Blind-Box(whole-set%EF%BC%89-i.569947420.41251000830"   # ✅ ลิงก์หน้าสินค้า (เปลี่ยนตามต้องการ)
 TARGET_TIME = "09:39:00"
 QUANTITY = 1                                    
 SESSION_FILE = "shopee_session.json"             
+LOGIN_URL = "https://shopee.co.th/buyer/login"  # ใช้กับ python browser_pool.py login ครั้งแรก
 
 def wait_until(target_time):
     """รอจนถึงเวลาที่กำหนด"""
@@ -42,35 +44,8 @@ def click_with_retry(page, selector, timeout=5000, description=""):
 
 with sync_playwright() as p:
     try:
-        print("🌐 เปิด Microsoft Edge...")
-
-        browser = p.chromium.launch(
-            channel="msedge", 
-            headless=False,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor'
-            ]
-        )
-        if os.path.exists(SESSION_FILE):
-            print("🔐 โหลด session ที่เคย login แล้ว...")
-            context = browser.new_context(storage_state=SESSION_FILE)
-        else:
-            print("🔑 ยังไม่มี session กรุณา login ด้วยตนเอง...")
-            context = browser.new_context()
-            page = context.new_page()
-            page.goto("https://shopee.co.th/buyer/login")
-            print("⏳ กรุณา login ด้วยตนเอง แล้วกด Enter ต่อ...")
-            input("👉 กด Enter เมื่อ login เสร็จสมบูรณ์...")
-            try:
-                page.wait_for_url("**/shopee.co.th/**", timeout=10000)
-                context.storage_state(path=SESSION_FILE)
-                print("✅ บันทึก session เรียบร้อย")
-            except:
-                print("❌ Login ไม่สำเร็จ กรุณาลองใหม่")
-                browser.close()
-                exit()
+        # ใช้ browser ที่เปิดรอไว้ (browser_pool.py serve) ถ้ามี และ session ที่บันทึกไว้ ไม่ต้องรอ login
+        browser, context = open_context(p, SESSION_FILE, LOGIN_URL)
         page = context.new_page()
         page.set_extra_http_headers({
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0"
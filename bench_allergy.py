@@ -0,0 +1,81 @@
+from allergy_query import AllergyIndex
+import json
+import random
+import sys
+import time
+
+DATASET_JSON = "updated_product_data.json"
+USERS = 5000
+MAX_ALLERGIES = 5
+# Synthetic catalogue big enough to show how building and decoding scale with product count
+LARGE_PRODUCTS = 100000
+LARGE_INGREDIENTS = 2000
+LARGE_PER_PRODUCT = 20
+LARGE_USERS = 50
+
+def naive_safe_products(data, allergic_ids):
+    """Walk every product's ingredient list, expanding allergic relations per query."""
+    relations = {ing['id']: ing['allergic-relation'] or [] for ing in data['ingredient']}
+    banned = set()
+    stack = list(allergic_ids)
+    while stack:
+        ingredient_id = stack.pop()
+        if ingredient_id not in banned:
+            banned.add(ingredient_id)
+            stack.extend(relations.get(ingredient_id, []))
+    return [p['id'] for p in data['product'] if not any(i in banned for i in p['ingredient'])]
+
+def random_users(data, count, seed=0):
+    """Users allergic to a few ingredients each, drawn from the ones products actually use."""
+    rng = random.Random(seed)
+    used = sorted({i for p in data['product'] for i in p['ingredient']})
+    return [{'id': n + 1, 'allergic': rng.sample(used, rng.randint(1, MAX_ALLERGIES))} for n in range(count)]
+
+def add_relations(data, seed=1):
+    """Give some ingredients relations so the transitive expansion is exercised."""
+    rng = random.Random(seed)
+    ids = [ing['id'] for ing in data['ingredient']]
+    for ing in rng.sample(data['ingredient'], len(ids) // 10):
+        ing['allergic-relation'] = rng.sample(ids, 2)
+
+def large_dataset(products=LARGE_PRODUCTS, ingredients=LARGE_INGREDIENTS, per_product=LARGE_PER_PRODUCT, seed=2):
+    rng = random.Random(seed)
+    return {
+        'ingredient': [{'id': i + 1, 'allergic-relation': None} for i in range(ingredients)],
+        'product': [{'id': p + 1, 'ingredient': rng.sample(range(1, ingredients + 1), per_product)}
+                    for p in range(products)],
+    }
+
+def bench(data, users):
+    print(f"📂 {len(data['product'])} products x {len(data['ingredient'])} ingredients, {len(users)} users")
+
+    start = time.perf_counter()
+    naive = {u['id']: naive_safe_products(data, u['allergic']) for u in users}
+    naive_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = AllergyIndex(data)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    fast = index.safe_products_batch(users)
+    query_seconds = time.perf_counter() - start
+
+    mismatches = sum(1 for u in users if sorted(naive[u['id']]) != sorted(fast[u['id']]))
+    print(f"🐢 Per-product scan: {naive_seconds:.2f}s")
+    print(f"⚡ Bitset index:     {build_seconds * 1000:.1f} ms build + {query_seconds * 1000:.1f} ms for all users")
+    print(f"🚀 Speedup: {naive_seconds / (build_seconds + query_seconds):.1f}x, {mismatches} user(s) with different results")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else USERS
+    with open(DATASET_JSON, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    add_relations(data)
+    bench(data, random_users(data, count))
+
+    # The real catalogue is small enough to hide anything quadratic in the product count
+    data = large_dataset()
+    add_relations(data)
+    bench(data, random_users(data, LARGE_USERS))
+
+if __name__ == "__main__":
+    main()
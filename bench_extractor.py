@@ -0,0 +1,104 @@
+from bs4 import BeautifulSoup
+from product_extractor import extract_page, split_sections
+import glob
+import os
+import re
+import sys
+import time
+
+DEBUG_DIR = "debug_html/"
+
+def legacy_extract(html, product_code):
+    """The BeautifulSoup extraction the scrapers used before product_extractor (prints removed)."""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    images = []
+    name = ''
+    for i in range(10):
+        class_name = f'ng-tns-c2042697079-{i}'
+        for media in soup.find_all('e2-media', class_=[class_name, 'ng-star-inserted', 'is-initialized']):
+            if media.get('format') in ['thumbnail', 'product'] or media.get('redzoomclass'):
+                continue
+            img = media.find('img')
+            if img:
+                src = img.get('src', '') or img.get('data-src', '')
+                if product_code in src:
+                    images.append(src)
+                    if not name:
+                        name = img.get('alt', '')
+
+    description = ''
+    for element in soup.find_all(['div', 'p', 'span'], class_=re.compile(r'(content ng-tns-c\d+-\d+|ng-tns-c\d+-\d+ ng-star-inserted|description|product-details)')):
+        description += element.text.strip() + '\n'
+    description = re.sub(r'\s+', ' ', description).strip()
+    full_description, using, ingredient_text = split_sections(description)
+
+    # final.parse_ingredients_from_html's ingredient block lookup
+    ingredient_block = ''
+    headers = soup.find_all(['h4', 'h3', 'div', 'span'], string=re.compile(r'ส่วนประกอบ|ส่วนผสม'))
+    for header in headers:
+        next_element = header.find_next(['p', 'div', 'span'], class_=re.compile(r'ng-tns-c\d+-\d+ ng-star-inserted|description|product-details'))
+        if next_element:
+            ingredient_block = next_element.get_text(strip=True)
+            break
+    if not ingredient_block:
+        sections = soup.find_all(string=re.compile(r'ส่วนประกอบ|ส่วนผสม'))
+        for section in sections:
+            parent = section.parent
+            next_sibling = parent.find_next_sibling(['p', 'div', 'span'])
+            if next_sibling:
+                ingredient_block = next_sibling.get_text(strip=True)
+                break
+            if parent.get_text(strip=True) and re.match(r'^[A-Z0-9\s\(\)\-\.\/,]*$', parent.get_text(strip=True)):
+                ingredient_block = parent.get_text(strip=True)
+                break
+
+    return {
+        'name': name,
+        'images': sorted(set(images)),
+        'description': full_description,
+        'using': using,
+        'ingredient_text': ingredient_text,
+        'ingredient_block': ingredient_block,
+    }
+
+def main():
+    files = sorted(glob.glob(os.path.join(DEBUG_DIR, "debug_page_*.html")))
+    if len(sys.argv) > 1:
+        files = files[:int(sys.argv[1])]
+    if not files:
+        print(f"❌ No debug pages found in {DEBUG_DIR}")
+        return
+
+    pages = []
+    total_bytes = 0
+    for path in files:
+        code = re.search(r'(WTCTH-\d+)', path).group(1)
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        total_bytes += len(html.encode('utf-8'))
+        pages.append((path, code, html))
+    print(f"📂 Loaded {len(pages)} pages ({total_bytes / 1024 / 1024:.1f} MB)")
+
+    start = time.perf_counter()
+    legacy = [legacy_extract(html, code) for _, code, html in pages]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fast = [extract_page(html, code) for _, code, html in pages]
+    fast_seconds = time.perf_counter() - start
+
+    mismatches = 0
+    for (path, _, _), old, new in zip(pages, legacy, fast):
+        new = dict(new, images=sorted(new['images']))
+        diff = [key for key in old if old[key] != new[key]]
+        if diff:
+            mismatches += 1
+            print(f"⚠️ {os.path.basename(path)} differs in: {', '.join(diff)}")
+
+    print(f"🐢 BeautifulSoup: {legacy_seconds:.2f}s ({legacy_seconds / len(pages) * 1000:.0f} ms/page)")
+    print(f"⚡ Single pass:   {fast_seconds:.2f}s ({fast_seconds / len(pages) * 1000:.0f} ms/page)")
+    print(f"🚀 Speedup: {legacy_seconds / fast_seconds:.1f}x, {mismatches} page(s) with different output")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+from product_extractor import extract_page
+from ingredient_tokenizer import parse_ingredient_text
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+DEBUG_DIR = "debug_html/"
+DATASET_JSON = "updated_product_data.json"
+REPEAT = 20
+
+def legacy_split_ingredients(ingredient_text):
+    """final.split_ingredients before ingredient_tokenizer."""
+    ingredients = []
+    current = []
+    paren_count = 0
+    for char in ingredient_text:
+        if char == '(':
+            paren_count += 1
+        elif char == ')':
+            paren_count -= 1
+        elif char == ',' and paren_count == 0:
+            ingredients.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if current:
+        ingredients.append(''.join(current).strip())
+    return [ing for ing in ingredients if ing]
+
+def legacy_parse(ingredient_text):
+    """final.parse_ingredient_text before ingredient_tokenizer."""
+    ingredient_text = ingredient_text.upper()
+    if re.search(r'[ป-ฮ]', ingredient_text):
+        ingredient_text = re.sub(r'[ป-ฮ]+', '', ingredient_text)
+
+    raw_ings = legacy_split_ingredients(ingredient_text)
+    ingredients = []
+
+    for raw_ing in raw_ings:
+        raw_ing = raw_ing.strip()
+        if not raw_ing:
+            continue
+        if ',' in raw_ing:
+            parts = [part.strip() for part in raw_ing.split(',') if part.strip()]
+            for part in parts:
+                word_count = len(re.split(r'\s+', part))
+                if word_count <= 4:
+                    ingredients.append(part)
+                else:
+                    words = re.split(r'\s+', part)
+                    temp_group = []
+                    for word in words:
+                        temp_group.append(word)
+                        if len(temp_group) >= 4 or re.search(r'(ACID|EXTRACT|ALCOHOL|POLYMER|BENZOATE|GLYCERIN|HYALURONATE|DIMETHYL|ETHYLHEXYL|TRIAZINE|PHENOL|DIMETHICONE|PEG|PPG|HYDROXY|CARBOMER|AMMONIUM|ACRYLATES|COPOLYMER|FRAGRANCE|PANTHENOL|ADENOSINE|EDTA|BUTYLENE|ALOE|CAMELLIA|SINENSIS|LEAF|HYDROLYZED|EXTENSIN|\d+,\d+-|BIS-|-OH|-YL|-IC|-ATE|-ONE|-INE|-ENE|-ANE|-OL|-ID|-IM|-AM|-UM|-ER)$', word.upper()):
+                            ingredients.append(' '.join(temp_group))
+                            temp_group = []
+                    if temp_group:
+                        ingredients.append(' '.join(temp_group))
+        else:
+            words = re.split(r'\s+', raw_ing)
+            current_group = []
+            for word in words:
+                word = word.strip()
+                if not word:
+                    continue
+                current_group.append(word)
+                if len(current_group) >= 1 and len(current_group) <= 4:
+                    if re.search(r'(ACID|EXTRACT|ALCOHOL|POLYMER|BENZOATE|GLYCERIN|HYALURONATE|DIMETHYL|ETHYLHEXYL|TRIAZINE|PHENOL|DIMETHICONE|PEG|PPG|HYDROXY|CARBOMER|AMMONIUM|ACRYLATES|COPOLYMER|FRAGRANCE|PANTHENOL|ADENOSINE|EDTA|BUTYLENE|ALOE|CAMELLIA|SINENSIS|LEAF|HYDROLYZED|EXTENSIN|\d+,\d+-|BIS-|-OH|-YL|-IC|-ATE|-ONE|-INE|-ENE|-ANE|-OL|-ID|-IM|-AM|-UM|-ER)$', word.upper()):
+                        ingredients.append(' '.join(current_group))
+                        current_group = []
+                    elif re.match(r'^[A-Z0-9]+(?:-[A-Z0-9]+)?$', word):
+                        continue
+                    else:
+                        ingredients.append(' '.join(current_group))
+                        current_group = []
+                else:
+                    ingredients.append(' '.join(current_group))
+                    current_group = []
+            if current_group:
+                ingredients.append(' '.join(current_group))
+
+    unique_ingredients = []
+    seen = set()
+    for ing in ingredients:
+        ing = ing.strip()
+        if ing and re.match(r'^[A-Z0-9\s\(\)\-\.\/,]*$', ing) and not re.search(r'[ป-ฮ]', ing):
+            word_count = len(re.split(r'\s+', ing))
+            if word_count <= 4:
+                ing_lower = ing.lower()
+                if ing_lower not in seen:
+                    seen.add(ing_lower)
+                    unique_ingredients.append(ing)
+
+    return unique_ingredients
+
+def load_inputs():
+    """Ingredient blocks of every archived page, plus the known ingredient names one by one and run together."""
+    texts = []
+    for path in sorted(glob.glob(os.path.join(DEBUG_DIR, "debug_page_*.html"))):
+        code = re.search(r'(WTCTH-\d+)', path).group(1)
+        with open(path, 'r', encoding='utf-8') as f:
+            block = extract_page(f.read(), code)['ingredient_block']
+        if block:
+            texts.append(block)
+    blocks = len(texts)
+    if os.path.exists(DATASET_JSON):
+        with open(DATASET_JSON, 'r', encoding='utf-8') as f:
+            names = [ing['name'] for ing in json.load(f)['ingredient']]
+        texts.extend(names)
+        texts.append(' '.join(names))
+    return texts, blocks
+
+def time_parser(parse, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [parse(text) for text in texts]
+    return (time.perf_counter() - start) / repeat, results
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else REPEAT
+    texts, blocks = load_inputs()
+    if not texts:
+        print(f"❌ No ingredient blocks found in {DEBUG_DIR}")
+        return
+    print(f"📂 {blocks} archived ingredient blocks + {len(texts) - blocks} ingredient-name inputs")
+
+    legacy_seconds, legacy = time_parser(legacy_parse, texts, repeat)
+    fast_seconds, fast = time_parser(parse_ingredient_text, texts, repeat)
+
+    mismatches = 0
+    for text, old, new in zip(texts, legacy, fast):
+        if old != new:
+            mismatches += 1
+            print(f"⚠️ Different output for: {text[:80]}...")
+
+    print(f"🐢 Regex per word:   {legacy_seconds * 1000:.1f} ms per pass")
+    print(f"⚡ Precompiled:      {fast_seconds * 1000:.1f} ms per pass")
+    print(f"🚀 Speedup: {legacy_seconds / fast_seconds:.1f}x, {mismatches} input(s) with different output")
+
+if __name__ == "__main__":
+    main()
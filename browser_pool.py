@@ -0,0 +1,319 @@
+from playwright.sync_api import sync_playwright
+from memory_watchdog import RSS_CHECK_EVERY, SERVE_PID_FILE, MemoryWatchdog, print_memory_summary
+from urllib.parse import urlparse
+import asyncio
+import os
+import sys
+import time
+
+SESSION_FILE = "watsons_session.json"
+LOGIN_URL = "https://www.watsons.co.th/th/login"
+HOME_URL = "https://www.watsons.co.th/th/"
+POOL_ENDPOINT = "http://127.0.0.1:9333"  # Where `python browser_pool.py serve` keeps a browser running
+POOL_PORT = 9333
+PAGES_PER_CONTEXT = 200  # Pages a context serves before it is replaced with a fresh one
+HEAP_LIMIT_MB = 512  # JS heap of a page above which its context is replaced early
+HEAP_CHECK_EVERY = 20  # Pages between heap checks on a context
+SESSION_REFRESH_INTERVAL = 600  # Seconds between saves of a live context's cookies to the session file
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0"
+LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-web-security',
+    '--disable-features=VizDisplayCompositor'
+]
+# Production mode: bundled Chromium without a window, so crawlers run in containers and on servers
+HEADLESS = os.environ.get('CRAWLER_HEADLESS') == '1'
+HEADLESS_ARGS = ['--disable-dev-shm-usage', '--disable-gpu']  # /dev/shm is tiny in containers
+HEAP_SCRIPT = "() => performance.memory ? performance.memory.usedJSHeapSize : 0"
+
+class SessionMissing(Exception):
+    """No saved login; crawls never stop to ask for one."""
+
+    def __init__(self, session_file, login_url=LOGIN_URL):
+        super().__init__(f"No session in {session_file}. Log in once with: "
+                         f"python browser_pool.py login {session_file} {login_url}")
+
+def require_session(session_file=SESSION_FILE, login_url=LOGIN_URL):
+    if not os.path.exists(session_file):
+        raise SessionMissing(session_file, login_url)
+
+def save_storage_state(state_saver, session_file):
+    """Write a context's storage state atomically, so a reader never sees half a session file.
+
+    The temp name is per process: serve and every attached crawler may save at once.
+    """
+    tmp_path = f"{session_file}.{os.getpid()}.tmp"
+    state_saver(tmp_path)
+    os.replace(tmp_path, session_file)
+
+def launch_options(headless=HEADLESS, extra_args=()):
+    """Keyword arguments for chromium.launch: Edge with a window, or headless bundled Chromium."""
+    if not headless:
+        return {'channel': "msedge", 'headless': False, 'args': LAUNCH_ARGS + list(extra_args)}
+    args = LAUNCH_ARGS + HEADLESS_ARGS + list(extra_args)
+    if hasattr(os, 'geteuid') and os.geteuid() == 0:
+        args.append('--no-sandbox')  # Chromium refuses to sandbox as root, as in most containers
+    return {'headless': True, 'args': args}
+
+# Sync scripts
+
+def open_browser(p):
+    """Attach to the pool service's browser if one is running, else launch one (see launch_options).
+
+    Closing an attached browser only disconnects from it, so callers close
+    it the same way either way.
+    """
+    try:
+        browser = p.chromium.connect_over_cdp(POOL_ENDPOINT, timeout=2000)
+        print(f"♻️ Using the warm browser at {POOL_ENDPOINT}")
+        return browser
+    except Exception:
+        print(f"🌐 Opening {'headless Chromium' if HEADLESS else 'Microsoft Edge'}...")
+        return p.chromium.launch(**launch_options())
+
+def open_context(p, session_file=SESSION_FILE, login_url=LOGIN_URL):
+    """A browser and a context logged in from session_file. Raises SessionMissing instead of prompting."""
+    require_session(session_file, login_url)
+    browser = open_browser(p)
+    print("🔐 Loading saved session...")
+    return browser, browser.new_context(storage_state=session_file)
+
+class PageRecycler:
+    """The sync scrapers' single page, with the crawl engine's memory cap.
+
+    Call page_done() after every job. When the memory watchdog sees RSS over
+    its limit, the context is closed and replaced with a fresh one from
+    session_file (set up again with on_context), so use .page rather than
+    keeping a reference to the page.
+    """
+
+    def __init__(self, browser, context, session_file=SESSION_FILE, on_context=None):
+        self.browser = browser
+        self.context = context
+        self.session_file = session_file
+        self.on_context = on_context
+        self.watchdog = MemoryWatchdog()
+        self.recycled = 0
+        if on_context:
+            on_context(context)
+        self.page = self._new_page()
+
+    def _new_page(self):
+        page = self.context.new_page()
+        page.set_extra_http_headers({"User-Agent": USER_AGENT})
+        return page
+
+    def page_done(self):
+        if not self.watchdog.page_done():
+            return
+        print("♻️ Recycling the context to bring RSS down")
+        self.context.close()
+        self.context = self.browser.new_context(storage_state=self.session_file)
+        if self.on_context:
+            self.on_context(self.context)
+        self.page = self._new_page()
+        self.recycled += 1
+
+def print_recycler_summary(pages):
+    if pages.recycled:
+        print(f"♻️ Context recycled {pages.recycled} times to stay under {pages.watchdog.limit_mb} MB")
+    print_memory_summary(pages.watchdog)
+
+# Async pool for the crawl engine
+
+class ContextSlot:
+    def __init__(self, context):
+        self.context = context
+        self.pages_served = 0
+        self.open_pages = 0
+        self.retiring = False
+
+class BrowserPool:
+    """Warm, logged-in contexts shared by the crawl engine's workers.
+
+    Workers lease a page with new_page() and hand it back after every job
+    with page_done(). A context that has served PAGES_PER_CONTEXT pages, or
+    whose page heap grew past HEAP_LIMIT_MB, stops getting new leases; its
+    pages are closed as their jobs finish and the context goes with the last
+    one, while a fresh context takes its place. When the memory watchdog sees
+    the whole process tree's RSS over its limit, the busiest context is
+    retired the same way. A page that crashed or was closed is never handed
+    back; the worker leases a fresh one. A background task saves the
+    live cookies to the session file every SESSION_REFRESH_INTERVAL.
+    """
+
+    def __init__(self, p, session_file=SESSION_FILE, size=1, on_context=None, login_url=LOGIN_URL):
+        self.p = p
+        self.session_file = session_file
+        self.size = size
+        self.on_context = on_context
+        self.login_url = login_url
+        self.browser = None
+        self.slots = []
+        self.stats = {'contexts': 0, 'recycled': 0, 'dead_pages': 0, 'session_saves': 0}
+        self._crashed = set()
+        self.watchdog = MemoryWatchdog()
+        self._refresher = None
+
+    async def start(self):
+        require_session(self.session_file, self.login_url)
+        try:
+            self.browser = await self.p.chromium.connect_over_cdp(POOL_ENDPOINT, timeout=2000)
+            print(f"♻️ Using the warm browser at {POOL_ENDPOINT}")
+        except Exception:
+            print(f"🌐 Opening {'headless Chromium' if HEADLESS else 'Microsoft Edge'}...")
+            self.browser = await self.p.chromium.launch(**launch_options())
+        for _ in range(self.size):
+            await self._add_slot()
+        self._refresher = asyncio.create_task(self._refresh_session())
+        return self
+
+    async def _add_slot(self):
+        context = await self.browser.new_context(storage_state=self.session_file)
+        if self.on_context:
+            await self.on_context(context)
+        slot = ContextSlot(context)
+        self.slots.append(slot)
+        self.stats['contexts'] += 1
+        return slot
+
+    async def new_page(self):
+        """Lease a page on the least busy live context. Returns (slot, page)."""
+        live = [slot for slot in self.slots if not slot.retiring]
+        slot = min(live, key=lambda s: s.open_pages) if live else await self._add_slot()
+        page = await slot.context.new_page()
+        page.on('crash', lambda _: self._crashed.add(page))
+        await page.set_extra_http_headers({"User-Agent": USER_AGENT})
+        slot.open_pages += 1
+        return slot, page
+
+    async def page_done(self, slot, page):
+        """Count a finished job; returns the page to keep using, or None if it was closed (dead or recycled)."""
+        slot.pages_served += 1
+        dead = page.is_closed() or page in self._crashed
+        if dead:
+            # Handing it back would fail every later job on it and trip the host's breaker for all workers
+            self.stats['dead_pages'] += 1
+            print("🩹 Replacing a page that crashed or was closed")
+        elif not slot.retiring and await self._due_for_recycling(slot, page):
+            await self._retire(slot)
+        if self.watchdog.page_done():
+            live = [s for s in self.slots if not s.retiring and s.pages_served >= RSS_CHECK_EVERY]
+            if live:
+                print("♻️ Recycling the busiest context to bring RSS down")
+                await self._retire(max(live, key=lambda s: s.pages_served))
+        if not slot.retiring and not dead:
+            return page
+        await self.close_page(slot, page)
+        return None
+
+    async def _retire(self, slot):
+        slot.retiring = True
+        self.stats['recycled'] += 1
+        await self._add_slot()
+
+    async def close_page(self, slot, page):
+        self._crashed.discard(page)
+        if not page.is_closed():
+            try:
+                await page.close()
+            except Exception:
+                pass  # A crashed page may not close cleanly; its context still goes below
+        slot.open_pages -= 1
+        if slot.retiring and slot.open_pages == 0:
+            self.slots.remove(slot)
+            await slot.context.close()
+
+    async def _due_for_recycling(self, slot, page):
+        if slot.pages_served >= PAGES_PER_CONTEXT:
+            print(f"♻️ Recycling a context after {slot.pages_served} pages")
+            return True
+        if slot.pages_served % HEAP_CHECK_EVERY == 0:
+            try:
+                heap_mb = await page.evaluate(HEAP_SCRIPT) / 1024 / 1024
+            except Exception:
+                return False
+            if heap_mb > HEAP_LIMIT_MB:
+                print(f"♻️ Recycling a context whose page heap reached {heap_mb:.0f} MB")
+                return True
+        return False
+
+    async def _refresh_session(self):
+        while True:
+            await asyncio.sleep(SESSION_REFRESH_INTERVAL)
+            live = [slot for slot in self.slots if not slot.retiring]
+            if not live:
+                continue
+            try:
+                context = live[0].context
+                tmp_path = f"{self.session_file}.{os.getpid()}.tmp"  # Same naming as save_storage_state
+                await context.storage_state(path=tmp_path)
+                os.replace(tmp_path, self.session_file)
+                self.stats['session_saves'] += 1
+            except Exception as e:
+                print(f"⚠️ Could not refresh {self.session_file}: {e}")
+
+    async def close(self):
+        if self._refresher:
+            self._refresher.cancel()
+        for slot in self.slots:
+            await slot.context.close()
+        self.slots = []
+        await self.browser.close()
+
+def print_pool_summary(pool):
+    print(f"🧰 Browser pool: {pool.stats['contexts']} contexts opened, {pool.stats['recycled']} recycled, "
+          f"{pool.stats['dead_pages']} dead pages replaced, session saved {pool.stats['session_saves']} times")
+    print_memory_summary(pool.watchdog)
+
+# Commands
+
+def login(session_file=SESSION_FILE, login_url=LOGIN_URL):
+    """The one interactive step: log in by hand and save the session for every later run."""
+    site = urlparse(login_url).netloc.removeprefix('www.')
+    with sync_playwright() as p:
+        browser = p.chromium.launch(channel="msedge", headless=False, args=LAUNCH_ARGS)
+        context = browser.new_context()
+        page = context.new_page()
+        page.goto(login_url)
+        print("⏳ Please log in manually in the browser window...")
+        input("👉 After successful login, press Enter here to save the session...")
+        page.wait_for_url(f"**/{site}/**", timeout=10000)
+        save_storage_state(lambda path: context.storage_state(path=path), session_file)
+        print(f"✅ Session saved to {session_file}")
+        browser.close()
+
+def serve(session_file=SESSION_FILE):
+    """Keep one browser running for every scraper to attach to, refreshing the session while idle."""
+    require_session(session_file)
+    with sync_playwright() as p:
+        browser = p.chromium.launch(**launch_options(extra_args=[f'--remote-debugging-port={POOL_PORT}']))
+        context = browser.new_context(storage_state=session_file)
+        page = context.new_page()
+        with open(SERVE_PID_FILE, 'w', encoding='utf-8') as f:
+            f.write(str(os.getpid()))  # Lets attached crawlers count this browser's memory
+        print(f"🧰 Browser pool serving at {POOL_ENDPOINT} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(SESSION_REFRESH_INTERVAL)
+                try:
+                    page.goto(HOME_URL, timeout=30000)  # Keeps the login cookies from going stale
+                    save_storage_state(lambda path: context.storage_state(path=path), session_file)
+                    print(f"🔄 Session refreshed in {session_file}")
+                except Exception as e:
+                    print(f"⚠️ Session refresh failed: {e}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if os.path.exists(SERVE_PID_FILE):
+                os.remove(SERVE_PID_FILE)
+            browser.close()
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "login":
+        login(*sys.argv[2:4])
+    elif command == "serve":
+        serve(*sys.argv[2:3])
+    else:
+        print("Usage: python browser_pool.py login [session_file] [login_url] | serve [session_file]")
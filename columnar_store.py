@@ -0,0 +1,194 @@
+from array import array
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+INPUT_JSON = "updated_product_data.json"
+OUTPUT_COLUMNAR = "updated_product_data.cols"
+MAGIC = b"CEDECOL1"
+ZLIB_LEVEL = 6
+
+# Layout of a .cols file:
+#   MAGIC | u64 header length | header JSON | column blobs
+# The header lists, per table, the row count and for every column its encoding and the
+# (offset, length) of its zlib-compressed blob, so a reader can seek straight to one column.
+# Encodings:
+#   int       array('q') of the values
+#   bool      one byte per value
+#   str       array('q') of end offsets followed by the UTF-8 text of all values
+#   int-list  array('q') of list end offsets, then array('q') of all items
+#   json      a JSON array (anything else: nulls, mixed types, lists of strings)
+# A key missing from some rows is stored as null and its row numbers listed under "missing".
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _encoding_of(values):
+    if all(_is_int(v) for v in values):
+        return 'int'
+    if all(isinstance(v, bool) for v in values):
+        return 'bool'
+    if all(isinstance(v, str) for v in values):
+        return 'str'
+    if all(isinstance(v, list) and all(_is_int(i) for i in v) for v in values):
+        return 'int-list'
+    return 'json'
+
+def _offsets(lengths):
+    ends = array('q')
+    total = 0
+    for length in lengths:
+        total += length
+        ends.append(total)
+    return ends
+
+def _encode(values, encoding):
+    if encoding == 'int':
+        return array('q', values).tobytes()
+    if encoding == 'bool':
+        return bytes(values)
+    if encoding == 'str':
+        encoded = [v.encode('utf-8') for v in values]
+        return _offsets(len(v) for v in encoded).tobytes() + b''.join(encoded)
+    if encoding == 'int-list':
+        items = array('q', (i for v in values for i in v))
+        return _offsets(len(v) for v in values).tobytes() + items.tobytes()
+    return json.dumps(values, ensure_ascii=False).encode('utf-8')
+
+def _decode(raw, encoding, rows):
+    if encoding == 'int':
+        return array('q', raw).tolist()
+    if encoding == 'bool':
+        return [bool(b) for b in raw]
+    if encoding in ('str', 'int-list'):
+        ends = array('q', raw[:8 * rows]).tolist()
+        body = raw[8 * rows:]
+        if encoding == 'int-list':
+            items = array('q', body).tolist()
+            return [items[start:end] for start, end in zip([0] + ends, ends)]
+        return [body[start:end].decode('utf-8') for start, end in zip([0] + ends, ends)]
+    return json.loads(raw)
+
+def write_columnar(data, path=OUTPUT_COLUMNAR):
+    """Write a dataset dict ({'user': [...], 'ingredient': [...], ...}) as a .cols file."""
+    header = {'tables': {}}
+    blobs = []
+    offset = 0
+    for table, rows in data.items():
+        columns = {}
+        names = list(dict.fromkeys(key for row in rows for key in row))
+        for name in names:
+            values = [row.get(name) for row in rows]
+            missing = [n for n, row in enumerate(rows) if name not in row]
+            present = [v for n, v in enumerate(values) if name in rows[n]]
+            encoding = _encoding_of(present) if not missing else 'json'
+            blob = zlib.compress(_encode(values, encoding), ZLIB_LEVEL)
+            columns[name] = {'encoding': encoding, 'offset': offset, 'length': len(blob)}
+            if missing:
+                columns[name]['missing'] = missing
+            blobs.append(blob)
+            offset += len(blob)
+        header['tables'][table] = {'rows': len(rows), 'columns': columns}
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+class ColumnarDataset:
+    """Read-only view of a .cols file that only reads and decodes the columns asked for."""
+
+    def __init__(self, path=OUTPUT_COLUMNAR):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a columnar dataset file")
+            (header_length,) = struct.unpack('<Q', f.read(8))
+            self.header = json.loads(f.read(header_length))
+        self.data_start = len(MAGIC) + 8 + header_length
+        self.tables = self.header['tables']
+        self._columns = {}
+
+    def columns(self, table):
+        return list(self.tables[table]['columns'])
+
+    def rows_in(self, table):
+        return self.tables[table]['rows']
+
+    def column(self, table, name):
+        """All values of one column, read from disk on first use."""
+        key = (table, name)
+        if key not in self._columns:
+            meta = self.tables[table]['columns'][name]
+            with open(self.path, 'rb') as f:
+                f.seek(self.data_start + meta['offset'])
+                raw = zlib.decompress(f.read(meta['length']))
+            self._columns[key] = _decode(raw, meta['encoding'], self.rows_in(table))
+        return self._columns[key]
+
+    def rows(self, table, columns=None):
+        """Rebuild the row dicts of a table, optionally with only some of its columns."""
+        names = columns or self.columns(table)
+        values = [self.column(table, name) for name in names]
+        missing = [set(self.tables[table]['columns'][name].get('missing', ())) for name in names]
+        rows = []
+        for n in range(self.rows_in(table)):
+            rows.append({name: column[n] for name, column, absent in zip(names, values, missing)
+                         if n not in absent})
+        return rows
+
+    def to_dict(self):
+        """The whole dataset, as json.load would have returned it."""
+        return {table: self.rows(table) for table in self.tables}
+
+def load_dataset(path):
+    """Load a dataset dict from either a .json or a .cols file."""
+    if path.endswith('.cols'):
+        return ColumnarDataset(path).to_dict()
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    if command == "export":
+        input_path = sys.argv[2] if len(sys.argv) > 2 else INPUT_JSON
+        output_path = sys.argv[3] if len(sys.argv) > 3 else OUTPUT_COLUMNAR
+        with open(input_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        write_columnar(data, output_path)
+
+        start = time.perf_counter()
+        with open(input_path, 'r', encoding='utf-8') as f:
+            json.load(f)
+        json_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        restored = ColumnarDataset(output_path).to_dict()
+        full_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        ColumnarDataset(output_path).column('product', 'name')
+        column_seconds = time.perf_counter() - start
+
+        print(f"✅ {input_path} ({os.path.getsize(input_path) / 1024:.0f} KB) -> "
+              f"{output_path} ({os.path.getsize(output_path) / 1024:.0f} KB)")
+        print(f"⏱️ Load: JSON {json_seconds * 1000:.1f} ms, all columns {full_seconds * 1000:.1f} ms, "
+              f"product names only {column_seconds * 1000:.1f} ms")
+        print(f"🔁 Round trip {'identical' if restored == data else 'DIFFERENT'}")
+    elif command == "import":
+        input_path = sys.argv[2] if len(sys.argv) > 2 else OUTPUT_COLUMNAR
+        output_path = sys.argv[3] if len(sys.argv) > 3 else INPUT_JSON
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(ColumnarDataset(input_path).to_dict(), f, ensure_ascii=False, indent=4)
+        print(f"✅ Saved data to {output_path}")
+    else:
+        print("Usage: python columnar_store.py [export [input.json] [output.cols] | import [input.cols] [output.json]]")
+
+if __name__ == "__main__":
+    main()
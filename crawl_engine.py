@@ -0,0 +1,113 @@
+from playwright.async_api import async_playwright
+from browser_pool import BrowserPool, print_pool_summary
+from navigation import REQUEUE_ROUNDS, NAV_STATS, TransientNavigationError
+from urllib.parse import urlparse
+import asyncio
+import time
+
+SESSION_FILE = "watsons_session.json"
+CONCURRENCY = 4  # Pages crawling at the same time
+CONTEXTS = 1  # Browser contexts the pages are spread over
+PER_HOST_LIMIT = 4  # Max in-flight navigations per host
+
+class HostLimiter:
+    """Hand out one semaphore per host so a single site never gets more than `limit` pages at once."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.semaphores = {}
+
+    def for_url(self, url):
+        host = urlparse(url).netloc
+        if host not in self.semaphores:
+            self.semaphores[host] = asyncio.Semaphore(self.limit)
+        return self.semaphores[host]
+
+async def _worker(worker_id, pool, queue, handler, limiter, stats):
+    """Pull jobs off the queue and run the handler on a page leased from the pool."""
+    slot, page = await pool.new_page()
+    try:
+        while True:
+            job = await queue.get()
+            try:
+                async with limiter.for_url(job['url']):
+                    await handler(page, job)
+                stats['done'] += 1
+            except TransientNavigationError as e:
+                # Back of the queue: by the time it comes round again the site has had time to recover
+                if job.get('requeued', 0) < REQUEUE_ROUNDS:
+                    job['requeued'] = job.get('requeued', 0) + 1
+                    NAV_STATS['requeued'] += 1
+                    print(f"↩️ Worker {worker_id} re-queued {job['url']}: {e}")
+                    queue.put_nowait(job)
+                else:
+                    stats['failed'] += 1
+                    print(f"❌ Worker {worker_id} gave up on {job['url']}: {e}")
+            except Exception as e:
+                stats['failed'] += 1
+                print(f"❌ Worker {worker_id} failed on {job['url']}: {e}")
+            finally:
+                try:
+                    page = await pool.page_done(slot, page)
+                    if page is None:  # Its context is being recycled
+                        slot, page = await pool.new_page()
+                finally:
+                    queue.task_done()
+    finally:
+        if page is not None:
+            await pool.close_page(slot, page)
+
+async def run_crawl(jobs, handler, concurrency=CONCURRENCY, contexts=CONTEXTS,
+                    per_host=PER_HOST_LIMIT, session_file=SESSION_FILE, on_context=None):
+    """Run `handler(page, job)` for every job on a pool of pages sharing one saved session.
+
+    The session must already exist (`python browser_pool.py login`); a
+    missing one raises browser_pool.SessionMissing before anything starts.
+
+    Each job is a dict with at least a 'url' key. Handlers are awaited on the
+    event loop thread, so they may mutate shared state (like the output obj)
+    without locking. `on_context`, if given, is awaited once per new context
+    before any page is opened on it (e.g. to install request routing). A
+    handler raising navigation.TransientNavigationError has its job put back
+    at the end of the queue, up to REQUEUE_ROUNDS times.
+    """
+    jobs = list(jobs)
+    stats = {'done': 0, 'failed': 0}
+    if not jobs:
+        return stats
+
+    concurrency = max(1, min(concurrency, len(jobs)))
+    contexts = max(1, min(contexts, concurrency))
+    start = time.perf_counter()
+
+    async with async_playwright() as p:
+        # Attaches to `python browser_pool.py serve` when it runs, so there is no browser startup
+        pool = await BrowserPool(p, session_file, size=contexts, on_context=on_context).start()
+        print(f"🧭 Crawling with {concurrency} pages over {contexts} context(s)...")
+        try:
+            queue = asyncio.Queue()
+            for job in jobs:
+                queue.put_nowait(job)
+
+            limiter = HostLimiter(per_host)
+            workers = [
+                asyncio.create_task(_worker(i, pool, queue, handler, limiter, stats))
+                for i in range(concurrency)
+            ]
+            # Re-queued jobs keep the queue unfinished, so wait for it to drain rather than for stop markers
+            # (or for every worker to have died, e.g. because the browser went away)
+            drained = asyncio.create_task(queue.join())
+            all_workers = asyncio.gather(*workers, return_exceptions=True)
+            await asyncio.wait([drained, all_workers], return_when=asyncio.FIRST_COMPLETED)
+            drained.cancel()
+            for worker in workers:
+                worker.cancel()
+            await all_workers
+        finally:
+            await pool.close()
+        print_pool_summary(pool)
+
+    elapsed = time.perf_counter() - start
+    print(f"⏱️ Crawled {stats['done']} pages ({stats['failed']} failed) in {elapsed:.1f}s "
+          f"({len(jobs) / elapsed:.2f} pages/s)")
+    return stats
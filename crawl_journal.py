@@ -0,0 +1,116 @@
+import json
+import os
+
+JOURNAL_FILE = "crawl_journal.jsonl"
+CURSOR_FILE = "crawl_cursor.json"
+CHECKPOINT_EVERY = 25  # Rewrite the full output (and move the cursor) after this many journal records
+
+# crawl_journal.jsonl gets one line per finished product, flushed and fsynced as it happens:
+#   {"url": ..., "status": "parsed"|"unchanged", "product": {...}, "ingredients": [...], "state": {...}}
+# crawl_cursor.json points at the last full snapshot of the output and the journal offset it covers:
+#   {"snapshot": "product_data_recursivefilter.json", "offset": <bytes of journal already in the snapshot>}
+# Resuming = load the snapshot, replay the journal from the offset on, skip every URL in the journal.
+
+class CrawlJournal:
+    """Append-only record of a crawl in progress, so an interrupted run can pick up where it stopped."""
+
+    def __init__(self, checkpoint, snapshot_path, path=JOURNAL_FILE, cursor_path=CURSOR_FILE,
+                 every=CHECKPOINT_EVERY):
+        self.checkpoint_fn = checkpoint  # Writes the full output to snapshot_path
+        self.snapshot_path = snapshot_path
+        self.path = path
+        self.cursor_path = cursor_path
+        self.every = every
+        self.completed = set()
+        self.pending = 0
+        self.file = None
+
+    def _read_records(self):
+        """Yield (end offset, record) for every complete line; a torn last line is cut off."""
+        if not os.path.exists(self.path):
+            return
+        good = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Killed mid-write: everything from here on is garbage
+                good += len(line)
+                yield good, record
+        if good != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(good)
+
+    def resume(self, obj, state):
+        """Return the output to continue from: the last snapshot (or obj) with the journal replayed on top."""
+        offset = 0
+        if os.path.exists(self.cursor_path):
+            with open(self.cursor_path, 'r', encoding='utf-8') as f:
+                cursor = json.load(f)
+            if os.path.exists(cursor['snapshot']):
+                with open(cursor['snapshot'], 'r', encoding='utf-8') as f:
+                    obj = json.load(f)
+                offset = cursor['offset']
+
+        replayed = 0
+        for end, record in self._read_records():
+            url = record['url']
+            self.completed.add(url)
+            if record.get('state'):
+                state[url] = record['state']
+            if end <= offset or record['status'] != 'parsed':
+                continue
+            apply_record(obj, record)
+            replayed += 1
+
+        if self.completed:
+            print(f"🔁 Resuming: {len(self.completed)} products already done, "
+                  f"{replayed} replayed from {self.path} since the last checkpoint")
+        return obj
+
+    def record(self, url, status, product=None, ingredients=None, state=None):
+        """Durably append one finished product; checkpoints the full output every `every` records."""
+        if self.file is None:
+            self.file = open(self.path, 'ab')
+        entry = {'url': url, 'status': status, 'product': product, 'ingredients': ingredients, 'state': state}
+        self.file.write((json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.completed.add(url)
+        self.pending += 1
+        if self.pending >= self.every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Write the full output, then move the cursor past everything it now contains."""
+        self.checkpoint_fn()
+        offset = self.file.tell() if self.file else 0
+        tmp_path = f"{self.cursor_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'snapshot': self.snapshot_path, 'offset': offset}, f)
+        os.replace(tmp_path, self.cursor_path)
+        self.pending = 0
+
+    def finish(self):
+        """The run completed and its output is saved: the journal is no longer needed."""
+        if self.file:
+            self.file.close()
+            self.file = None
+        for path in (self.path, self.cursor_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+def apply_record(obj, record):
+    """Put a journalled product (and the ingredients it references) into obj."""
+    known = {ing['id'] for ing in obj['ingredient']}
+    for ing in record['ingredients'] or []:
+        if ing['id'] not in known:
+            obj['ingredient'].append(ing)
+            known.add(ing['id'])
+    product = record['product']
+    for index, prod in enumerate(obj['product']):
+        if prod['id'] == product['id']:
+            obj['product'][index] = product
+            return
+    obj['product'].append(product)
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+import json
+import os
+
+STATE_FILE = "crawl_state.json"
+INCREMENTAL = True  # Skip recently refreshed products and keep unchanged ones as they are
+MIN_REFRESH_AGE = timedelta(hours=20)  # Products fetched more recently than this are not re-fetched
+
+# Per-URL record:
+#   {"etag": ..., "last_modified": ..., "digest": <page_store.content_digest of the extracted fields>,
+#    "last_success": <iso time of the last successful parse>, "last_changed": <iso time>}
+
+def load_state(path=STATE_FILE):
+    """Load the per-URL crawl state, or an empty state on the first run."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_state(state, path=STATE_FILE):
+    """Write the crawl state atomically so an interrupted run never leaves it half-written."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+def is_fresh(entry, now=None, max_age=MIN_REFRESH_AGE):
+    """True if the URL was fetched successfully within max_age."""
+    if not entry or not entry.get('last_success'):
+        return False
+    now = now or datetime.now()
+    return now - datetime.fromisoformat(entry['last_success']) < max_age
+
+def conditional_headers(entry):
+    """If-None-Match / If-Modified-Since headers for revalidating a URL."""
+    headers = {}
+    if entry and entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry and entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+def mark_unchanged(state, url):
+    """Record a successful revalidation that found nothing new."""
+    state.setdefault(url, {})['last_success'] = datetime.now().isoformat(timespec='seconds')
+
+def has_changed(entry, digest):
+    """True if a page's content digest differs from the one recorded for it."""
+    return not entry or entry.get('digest') != digest
+
+def record_fetch(state, url, digest, validators=None):
+    """Record a fetch that parsed successfully; returns True if the page content changed since the last one.
+
+    Only call this once the page has been parsed (or confirmed unchanged), so a
+    page that failed to parse is neither fresh nor unchanged on the next run.
+    """
+    entry = state.setdefault(url, {})
+    now = datetime.now().isoformat(timespec='seconds')
+    changed = has_changed(entry, digest)
+    entry['digest'] = digest
+    entry['last_success'] = now
+    if changed:
+        entry['last_changed'] = now
+    for key in ('etag', 'last_modified'):
+        if validators and validators.get(key):
+            entry[key] = validators[key]
+    return changed
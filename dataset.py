@@ -0,0 +1,179 @@
+from collections import defaultdict
+from columnar_store import load_dataset
+import argparse
+import re
+
+DATASET_JSON = "updated_product_data.json"
+GRAM = 3  # Thai is written without spaces, so Thai text is indexed by character trigrams
+
+LATIN_TOKEN_RE = re.compile(r'[a-z0-9]+')
+THAI_RUN_RE = re.compile(r'[฀-๿]+')
+
+def extract_bp_number(link):
+    """Extract BP_xxxxxx number from product link."""
+    match = re.search(r'/p/BP_(\d+)', link)
+    return match.group(1) if match else None
+
+def product_code_of(product):
+    """The WTCTH code of a product, from product_codes or derived from its link."""
+    if product.get('product_codes'):
+        return product['product_codes'][0]
+    bp_number = extract_bp_number(product.get('link', ''))
+    return f"WTCTH-{bp_number}" if bp_number else None
+
+def search_terms(text):
+    """Index terms of a text: lower-cased Latin words plus trigrams of every Thai run."""
+    text = text.lower()
+    terms = set(LATIN_TOKEN_RE.findall(text))
+    for run in THAI_RUN_RE.findall(text):
+        if len(run) < GRAM:
+            terms.add(run)
+        else:
+            terms.update(run[i:i + GRAM] for i in range(len(run) - GRAM + 1))
+    return terms
+
+class ProductDataset:
+    """A loaded product dataset with the indexes lookups and search need, built once.
+
+    Products, ingredients and categories are looked up by id, products also by
+    code and link, and the inverted indexes map ingredient, category and
+    search term to product ids.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.products = {p['id']: p for p in data['product']}
+        self.ingredients = {ing['id']: ing for ing in data['ingredient']}
+        self.categories = {c['id']: c for c in data.get('category', [])}
+        self.users = {u['id']: u for u in data.get('user', [])}
+        self.ingredient_by_name = {ing['name'].lower(): ing for ing in data['ingredient']}
+        self.by_code = {}
+        self.by_link = {}
+        self.by_ingredient = defaultdict(set)
+        self.by_category = defaultdict(set)
+        self.by_term = defaultdict(set)
+        self.name_terms = {}
+        for product in data['product']:
+            product_id = product['id']
+            code = product_code_of(product)
+            if code:
+                self.by_code[code] = product
+            if product.get('link'):
+                self.by_link[product['link']] = product
+            for ingredient_id in product['ingredient']:
+                self.by_ingredient[ingredient_id].add(product_id)
+            self.by_category[product.get('category')].add(product_id)
+            self.name_terms[product_id] = search_terms(product.get('name', ''))
+            for term in self.name_terms[product_id] | search_terms(product.get('description', '')):
+                self.by_term[term].add(product_id)
+        self.thai_terms = [term for term in self.by_term if THAI_RUN_RE.fullmatch(term)]
+        self._allergy_index = None
+
+    @classmethod
+    def load(cls, path=DATASET_JSON):
+        """Load from a .json or a columnar .cols export."""
+        return cls(load_dataset(path))
+
+    def product(self, product_id):
+        return self.products.get(product_id)
+
+    def product_by_code(self, code):
+        return self.by_code.get(code)
+
+    def product_by_link(self, link):
+        return self.by_link.get(link)
+
+    def ingredient(self, ingredient_id):
+        return self.ingredients.get(ingredient_id)
+
+    def find_ingredient(self, name):
+        """The ingredient called name (case-insensitively), or None."""
+        return self.ingredient_by_name.get(name.lower())
+
+    def _products(self, ids):
+        return [self.products[i] for i in sorted(ids)]
+
+    def products_with_ingredient(self, ingredient_id):
+        return self._products(self.by_ingredient.get(ingredient_id, ()))
+
+    def products_in_category(self, category_id):
+        return self._products(self.by_category.get(category_id, ()))
+
+    def search(self, query, category_id=None, limit=20):
+        """Products whose name or description contains every word of query, best matches first.
+
+        Latin words match whole words; Thai text matches as a substring. Name
+        matches rank above description-only matches.
+        """
+        terms = search_terms(query)
+        if not terms:
+            return []
+        postings = sorted((self._postings(term) for term in terms), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        if category_id is not None:
+            candidates &= self.by_category.get(category_id, set())
+        # Trigrams only narrow the Thai part down; confirm the runs really occur
+        thai_runs = [run for run in THAI_RUN_RE.findall(query.lower()) if len(run) > GRAM]
+        if thai_runs:
+            candidates = {i for i in candidates
+                          if all(run in f"{self.products[i].get('name', '')} {self.products[i].get('description', '')}".lower()
+                                 for run in thai_runs)}
+        short = [term for term in terms if self._is_short_thai(term)]
+        ranked = sorted(candidates, key=lambda i: (-len(terms & self.name_terms[i])
+                                                   - sum(term in self.products[i].get('name', '') for term in short), i))
+        return [self.products[i] for i in ranked[:limit]]
+
+    @staticmethod
+    def _is_short_thai(term):
+        return len(term) < GRAM and THAI_RUN_RE.fullmatch(term) is not None
+
+    def _postings(self, term):
+        """Products containing an index term.
+
+        A Thai run shorter than GRAM has no trigram of its own, so it matches
+        every product with a Thai term (trigram or short run) containing it.
+        """
+        if not self._is_short_thai(term):
+            return self.by_term.get(term, set())
+        products = set()
+        for other in self.thai_terms:
+            if term in other:
+                products |= self.by_term[other]
+        return products
+
+    def safe_products(self, user_id):
+        """Products free of the user's allergies, via allergy_query."""
+        if self._allergy_index is None:
+            from allergy_query import AllergyIndex
+            self._allergy_index = AllergyIndex(self.data)
+        return self._products(self._allergy_index.safe_products(self.users[user_id]['allergic']))
+
+def main():
+    parser = argparse.ArgumentParser(description="Look products up in the dataset.")
+    parser.add_argument('--input', default=DATASET_JSON)
+    commands = parser.add_subparsers(dest='command', required=True)
+    search = commands.add_parser('search', help="full-text search over names and descriptions")
+    search.add_argument('query')
+    search.add_argument('--category', type=int)
+    search.add_argument('--limit', type=int, default=20)
+    ingredient = commands.add_parser('ingredient', help="products containing an ingredient")
+    ingredient.add_argument('name')
+    code = commands.add_parser('code', help="product by WTCTH code")
+    code.add_argument('code')
+    args = parser.parse_args()
+
+    dataset = ProductDataset.load(args.input)
+    if args.command == 'search':
+        products = dataset.search(args.query, args.category, args.limit)
+    elif args.command == 'ingredient':
+        ing = dataset.find_ingredient(args.name)
+        products = dataset.products_with_ingredient(ing['id']) if ing else []
+    else:
+        product = dataset.product_by_code(args.code)
+        products = [product] if product else []
+    for product in products:
+        print(f"🔎 {product['id']}: {product['name']}")
+    print(f"✅ {len(products)} product(s)")
+
+if __name__ == "__main__":
+    main()
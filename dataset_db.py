@@ -0,0 +1,297 @@
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+USE_DATABASE = True  # Scrapers upsert each product into their dataset's database as it is parsed; JSON is exported from it
+BUSY_TIMEOUT = 30  # Seconds a writer waits for another process's transaction before giving up
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS category (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ingredient (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    name_key TEXT UNIQUE,              -- lower-cased name; NULL for legacy duplicates
+    allergic INTEGER NOT NULL DEFAULT 0,
+    allergic_relation TEXT             -- JSON list of ingredient ids, or NULL
+);
+CREATE TABLE IF NOT EXISTS product (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    description TEXT,
+    using_text TEXT,
+    image TEXT,                        -- JSON: a list of urls, or a single url string
+    category INTEGER,
+    link TEXT UNIQUE,
+    extra TEXT                         -- JSON object of any other keys (product_codes, price...)
+);
+CREATE TABLE IF NOT EXISTS product_ingredient (
+    product_id INTEGER NOT NULL REFERENCES product(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    ingredient_id INTEGER NOT NULL,    -- not a foreign key: hand-edited datasets have dangling ids
+    PRIMARY KEY (product_id, position)
+);
+CREATE INDEX IF NOT EXISTS product_ingredient_by_ingredient ON product_ingredient(ingredient_id);
+CREATE INDEX IF NOT EXISTS product_by_category ON product(category);
+CREATE TABLE IF NOT EXISTS user (
+    id INTEGER PRIMARY KEY,
+    allergic TEXT NOT NULL             -- JSON list of ingredient ids
+);
+"""
+
+PRODUCT_KEYS = ('id', 'name', 'description', 'using', 'image', 'ingredient', 'category', 'link')
+
+class DatasetMismatch(Exception):
+    """The database doesn't match the JSON a script works on: another dataset, or one edited since."""
+
+def db_path_for(json_path):
+    """The database of the dataset kept in json_path: one per dataset, next to its JSON."""
+    return f"{os.path.splitext(json_path)[0]}.db"
+
+def file_sha(path):
+    """sha256 of a file's bytes, or None if it doesn't exist."""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def connect(path):
+    """Open the store in WAL mode: readers never block, writers queue on a busy timeout."""
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+class DatasetDB:
+    """The product dataset in SQLite, with the same interning API as registry.DatasetRegistry.
+
+    Every write is its own short transaction, so each product is durable as
+    soon as it is stored and several crawler processes can share one file.
+    A sink (ndjson_output.NdjsonWriter) also receives each new ingredient and
+    stored product, as with DatasetRegistry.
+
+    With source (the dataset's JSON file), a new database is tagged with it and
+    an existing one tagged with another file raises DatasetMismatch, so one
+    script never seeds or overwrites its JSON from another script's data.
+    The database also keeps the sha of the JSON as it last imported or wrote
+    it (mark_synced), so seed() can tell when the JSON was edited behind it.
+    """
+
+    def __init__(self, path, canon=None, sink=None, source=None):
+        self.path = path
+        self.canon = canon
+        self.sink = sink
+        self.source = source
+        self.conn = connect(path)
+        if source is not None:
+            self._check_source(os.path.basename(source))
+
+    def _check_source(self, source):
+        with self.transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('source', ?)", (source,))
+            recorded = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()[0]
+        if recorded != source:
+            self.close()
+            raise DatasetMismatch(f"{self.path} holds the dataset of {recorded}, not {source}")
+
+    def seed(self, data):
+        """Import data (loaded from source) into an empty database; a filled one must be in sync with source.
+
+        Raises DatasetMismatch if source changed since the database last
+        imported or wrote it, rather than overwriting those edits with an export.
+        """
+        if self.is_empty():
+            self.import_json(data)
+            self.mark_synced()
+            return
+        recorded = self.conn.execute("SELECT value FROM meta WHERE key = 'source_sha'").fetchone()
+        current = file_sha(self.source)
+        if current is not None and (recorded is None or recorded[0] != current):
+            raise DatasetMismatch(
+                f"{self.source} was changed since {self.path} last imported or wrote it. "
+                f"To keep the JSON, delete {self.path} and it is re-imported; to keep the database, "
+                f"run: python dataset_db.py export {self.source} {self.path}")
+
+    def mark_synced(self):
+        """Remember source as it is now, after importing it or writing it from export()."""
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source_sha', ?)",
+                         (file_sha(self.source),))
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """BEGIN IMMEDIATE takes the write lock up front, so concurrent upserts never deadlock."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def is_empty(self):
+        return self.conn.execute("SELECT NOT EXISTS (SELECT 1 FROM product) "
+                                 "AND NOT EXISTS (SELECT 1 FROM ingredient)").fetchone()[0] == 1
+
+    # Ingredients
+
+    def find_ingredient(self, name):
+        """Id of the ingredient called name (case-insensitively), or None."""
+        row = self.conn.execute("SELECT id FROM ingredient WHERE name_key = ?", (name.lower(),)).fetchone()
+        return row[0] if row else None
+
+    def _intern(self, conn, name):
+        if self.canon is not None:
+            name = self.canon.resolve(name)
+        added = conn.execute("INSERT INTO ingredient (name, name_key) VALUES (?, ?) ON CONFLICT(name_key) DO NOTHING",
+                             (name, name.lower())).rowcount
+        ingredient_id = conn.execute("SELECT id FROM ingredient WHERE name_key = ?", (name.lower(),)).fetchone()[0]
+        if added and self.sink is not None:
+            self.sink.write('ingredient', {'id': ingredient_id, 'name': name, 'allergic': False, 'allergic-relation': None})
+        return ingredient_id
+
+    def ingredient_id(self, name):
+        """Id of the ingredient called name, adding it if it is new."""
+        with self.transaction() as conn:
+            return self._intern(conn, name)
+
+    def ingredient_ids(self, names):
+        """ingredient_id for each name, in order, in one transaction."""
+        with self.transaction() as conn:
+            return [self._intern(conn, name) for name in names]
+
+    def ingredient(self, ingredient_id):
+        row = self.conn.execute("SELECT id, name, allergic, allergic_relation FROM ingredient WHERE id = ?",
+                                (ingredient_id,)).fetchone()
+        return _ingredient_dict(row) if row else None
+
+    # Products
+
+    def product(self, product_id):
+        row = self.conn.execute("SELECT * FROM product WHERE id = ?", (product_id,)).fetchone()
+        return self._product_dict(row) if row else None
+
+    def product_by_link(self, link):
+        row = self.conn.execute("SELECT * FROM product WHERE link = ?", (link,)).fetchone()
+        return self._product_dict(row) if row else None
+
+    def _product_dict(self, row, ingredients=None):
+        product_id, name, description, using, image, category, link, extra = row
+        if ingredients is None:
+            ingredients = [i for (i,) in self.conn.execute(
+                "SELECT ingredient_id FROM product_ingredient WHERE product_id = ? ORDER BY position", (product_id,))]
+        product = {'id': product_id, 'name': name, 'description': description, 'using': using,
+                   'image': json.loads(image), 'ingredient': ingredients, 'category': category, 'link': link}
+        product.update(json.loads(extra or '{}'))
+        return product
+
+    def _upsert_product(self, conn, product):
+        extra = {k: v for k, v in product.items() if k not in PRODUCT_KEYS}
+        values = (product.get('name'), product.get('description'), product.get('using'),
+                  json.dumps(product.get('image', ''), ensure_ascii=False), product.get('category'),
+                  product.get('link'), json.dumps(extra, ensure_ascii=False) if extra else None)
+        if product.get('id') is None:
+            # Upsert on the link: re-scraping a product updates it in place
+            product_id = conn.execute(
+                "INSERT INTO product (name, description, using_text, image, category, link, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(link) DO UPDATE SET name=excluded.name, "
+                "description=excluded.description, using_text=excluded.using_text, image=excluded.image, "
+                "category=excluded.category, extra=excluded.extra RETURNING id", values).fetchone()[0]
+        else:
+            product_id = product['id']
+            conn.execute(
+                "INSERT INTO product (id, name, description, using_text, image, category, link, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET name=excluded.name, "
+                "description=excluded.description, using_text=excluded.using_text, image=excluded.image, "
+                "category=excluded.category, link=excluded.link, extra=excluded.extra", (product_id,) + values)
+        conn.execute("DELETE FROM product_ingredient WHERE product_id = ?", (product_id,))
+        conn.executemany("INSERT INTO product_ingredient (product_id, position, ingredient_id) VALUES (?, ?, ?)",
+                         [(product_id, n, i) for n, i in enumerate(product.get('ingredient', []))])
+        return product_id
+
+    def put_product(self, fields, product_id=None):
+        """Insert or update a product (by product_id, else by link) and its ingredient links. Returns it."""
+        with self.transaction() as conn:
+            product_id = self._upsert_product(conn, dict(fields, id=product_id))
+        product = self.product(product_id)
+        if self.sink is not None:
+            self.sink.write('product', product)
+        return product
+
+    # Whole dataset
+
+    def import_json(self, data):
+        """Load a dataset dict, keeping its ids, in one transaction."""
+        with self.transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO category (id, name) VALUES (?, ?)",
+                             [(c['id'], c['name']) for c in data.get('category', [])])
+            seen = set()
+            for ing in data.get('ingredient', []):
+                key = ing['name'].lower()
+                conn.execute("INSERT OR REPLACE INTO ingredient (id, name, name_key, allergic, allergic_relation) "
+                             "VALUES (?, ?, ?, ?, ?)",
+                             (ing['id'], ing['name'], None if key in seen else key, int(ing['allergic']),
+                              json.dumps(ing['allergic-relation']) if ing['allergic-relation'] is not None else None))
+                seen.add(key)
+            for product in data.get('product', []):
+                self._upsert_product(conn, product)
+            conn.executemany("INSERT OR REPLACE INTO user (id, allergic) VALUES (?, ?)",
+                             [(u['id'], json.dumps(u['allergic'])) for u in data.get('user', [])])
+
+    def export(self):
+        """The whole store as the dataset dict the JSON files hold."""
+        links = {}
+        for product_id, ingredient_id in self.conn.execute(
+                "SELECT product_id, ingredient_id FROM product_ingredient ORDER BY product_id, position"):
+            links.setdefault(product_id, []).append(ingredient_id)
+        return {
+            'user': [{'id': i, 'allergic': json.loads(a)} for i, a in self.conn.execute("SELECT id, allergic FROM user ORDER BY id")],
+            'ingredient': [_ingredient_dict(row) for row in self.conn.execute(
+                "SELECT id, name, allergic, allergic_relation FROM ingredient ORDER BY id")],
+            'category': [{'id': i, 'name': n} for i, n in self.conn.execute("SELECT id, name FROM category ORDER BY id")],
+            'product': [self._product_dict(row, links.get(row[0], []))
+                        for row in self.conn.execute("SELECT * FROM product ORDER BY id")],
+        }
+
+def _ingredient_dict(row):
+    ingredient_id, name, allergic, relation = row
+    return {'id': ingredient_id, 'name': name, 'allergic': bool(allergic),
+            'allergic-relation': json.loads(relation) if relation is not None else None}
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "import" and len(sys.argv) > 2:
+        with open(sys.argv[2], 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        db = DatasetDB(sys.argv[3] if len(sys.argv) > 3 else db_path_for(sys.argv[2]), source=sys.argv[2])
+        db.import_json(data)
+        db.mark_synced()
+        print(f"✅ Imported {len(data['product'])} products and {len(data['ingredient'])} ingredients into {db.path}")
+    elif command == "export" and len(sys.argv) > 2:
+        db = DatasetDB(sys.argv[3] if len(sys.argv) > 3 else db_path_for(sys.argv[2]), source=sys.argv[2])
+        with open(sys.argv[2], 'w', encoding='utf-8') as f:
+            json.dump(db.export(), f, ensure_ascii=False, indent=4)
+        db.mark_synced()
+        print(f"✅ Saved data to {sys.argv[2]}")
+    else:
+        print("Usage: python dataset_db.py import <input.json> [db] | export <output.json> [db]")
+
+if __name__ == "__main__":
+    main()
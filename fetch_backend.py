@@ -0,0 +1,174 @@
+import json
+import os
+import time
+import threading
+import requests
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from crawl_state import conditional_headers
+from navigation import PROBE_POLL, breaker_for
+from rate_limiter import ADAPTIVE_RATE, limiter_for, is_throttled_status
+from telemetry import Trace
+
+SESSION_FILE = "watsons_session.json"
+PREFER_HTTP = True  # Try a plain HTTP GET before opening the page in the browser
+HTTP_TIMEOUT = 20
+POOL_SIZE = 16  # Keep-alive connections kept per host
+HTTP_WORKERS = 8  # Concurrent HTTP fetches
+HTTP_BLOCK_LIMIT = 5  # Consecutive blocked HTTP fetches after which the rest of the run goes straight to the browser
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "th-TH,th;q=0.9,en-US;q=0.8,en;q=0.7",
+}
+
+FETCH_STATS = {'http': 0, 'not_modified': 0, 'browser': 0, 'http_seconds': 0.0, 'http_skipped': 0}
+HTTP_HEALTH = {'blocked_streak': 0, 'unavailable': False}
+_health_lock = threading.Lock()
+
+def load_session_cookies(session, session_file=SESSION_FILE):
+    """Copy the cookies from a Playwright storage_state file into a requests session."""
+    if not os.path.exists(session_file):
+        print(f"⚠️ Session file {session_file} not found, fetching without cookies")
+        return 0
+    with open(session_file, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    cookies = state.get('cookies', [])
+    for cookie in cookies:
+        session.cookies.set(cookie['name'], cookie['value'],
+                            domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    return len(cookies)
+
+def new_http_session(session_file=SESSION_FILE, pool_size=POOL_SIZE):
+    """Create a pooled keep-alive session that carries the saved browser cookies."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    count = load_session_cookies(session, session_file)
+    print(f"🔌 HTTP backend ready with {count} cookies from {session_file}")
+    return session
+
+def is_server_rendered(html, product_code):
+    """True if the HTML already contains the product markup the parser needs.
+
+    The storefront renders product pages server-side most of the time, but a
+    cold cache or a bot check returns an empty app shell instead.
+    """
+    return '<e2-media' in html and f'{product_code}-' in html and 'รายละเอียดสินค้า' in html
+
+def record_blocked(blocked):
+    """Track consecutive blocked fetches; after HTTP_BLOCK_LIMIT of them HTTP is marked unavailable."""
+    with _health_lock:
+        if not blocked:
+            HTTP_HEALTH['blocked_streak'] = 0
+            return
+        HTTP_HEALTH['blocked_streak'] += 1
+        if HTTP_HEALTH['blocked_streak'] >= HTTP_BLOCK_LIMIT and not HTTP_HEALTH['unavailable']:
+            HTTP_HEALTH['unavailable'] = True
+            print(f"🚧 HTTP blocked {HTTP_HEALTH['blocked_streak']} times in a row, "
+                  f"sending the remaining pages to the browser")
+
+def wait_for_http(breaker):
+    """Sleep until the HTTP breaker lets a request through; False if HTTP was marked unavailable meanwhile."""
+    wait = breaker.wait_time()
+    while wait and not HTTP_HEALTH['unavailable']:
+        time.sleep(min(wait, PROBE_POLL))
+        wait = breaker.wait_time()
+    return not HTTP_HEALTH['unavailable']
+
+def fetch_page(session, url, product_code, entry=None, trace=None):
+    """Fetch a product page over HTTP, revalidating against a crawl-state entry if given.
+
+    Returns (status, html, validators) where status is 'ok', 'not-modified'
+    (the server confirmed the stored copy is current) or 'miss' (the browser
+    is needed). Requests are paced and circuit-broken per host apart from the
+    browser's navigations, so a bot wall that only answers plain HTTP doesn't
+    hold the browser back; once HTTP is marked unavailable every fetch is an
+    immediate miss. The response body's size is added to trace.bytes_received.
+    """
+    breaker = breaker_for(url, backend='http')
+    limiter = limiter_for(url, backend='http')
+    if not wait_for_http(breaker):
+        FETCH_STATS['http_skipped'] += 1
+        return 'miss', None, None
+    if ADAPTIVE_RATE:
+        limiter.acquire()
+    start = time.perf_counter()
+    try:
+        resp = session.get(url, timeout=HTTP_TIMEOUT, headers=conditional_headers(entry))
+    except requests.RequestException as e:
+        limiter.record(time.perf_counter() - start, throttled=True)
+        breaker.record_failure()
+        print(f"⚠️ HTTP fetch failed for {url}: {e}")
+        return 'miss', None, None
+    finally:
+        FETCH_STATS['http_seconds'] += time.perf_counter() - start
+
+    if trace is not None:
+        trace.bytes_received += len(resp.content)
+    throttled = is_throttled_status(resp.status_code, resp.url)
+    limiter.record(resp.elapsed.total_seconds(), throttled)
+    record_blocked(throttled)
+    if throttled:
+        breaker.record_failure()
+        print(f"🚧 {product_code} blocked over HTTP ({resp.status_code}), using browser")
+        return 'miss', None, None
+    breaker.record_success()
+
+    if resp.status_code == 304:
+        FETCH_STATS['not_modified'] += 1
+        print(f"♻️ {product_code} not modified since the last crawl")
+        return 'not-modified', None, None
+    if resp.status_code != 200 or not is_server_rendered(resp.text, product_code):
+        print(f"↪️ {product_code} not server-rendered (HTTP {resp.status_code}), using browser")
+        return 'miss', None, None
+    FETCH_STATS['http'] += 1
+    print(f"⚡ Fetched {product_code} over HTTP in {resp.elapsed.total_seconds():.2f}s")
+    validators = {'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+    return 'ok', resp.text, validators
+
+def fetch_html(session, url, product_code):
+    """Fetch a product page over HTTP; return None when the browser is needed."""
+    status, html, _ = fetch_page(session, url, product_code)
+    return html if status == 'ok' else None
+
+def fetch_many(session, jobs, workers=HTTP_WORKERS, state=None):
+    """Fetch jobs over HTTP in parallel, yielding (job, (status, html, validators)) as each one completes.
+
+    At most two fetches per worker are in flight or waiting to be consumed, so
+    the caller parses and journals every page as it arrives instead of the
+    whole catalog's HTML piling up in memory. Each job also gets the URL's
+    telemetry Trace under 'trace', started with the fetch and holding its
+    'fetch' stage and the bytes received.
+    """
+    state = state or {}
+    jobs = iter(jobs)
+
+    def fetch(job):
+        trace = job['trace'] = Trace(job['url'], source='http')
+        with trace.stage('fetch'):
+            return fetch_page(session, job['url'], job['product_code'], state.get(job['url']), trace)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(fetch, job): job for job in islice(jobs, workers * 2)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+                job = next(jobs, None)
+                if job is not None:
+                    pending[pool.submit(fetch, job)] = job
+
+def print_fetch_summary():
+    """Print how many pages were served by each backend."""
+    total = FETCH_STATS['http'] + FETCH_STATS['not_modified'] + FETCH_STATS['browser']
+    if not total:
+        return
+    print(f"🔌 Fetch backends: {FETCH_STATS['http']} over HTTP, {FETCH_STATS['not_modified']} not modified, "
+          f"{FETCH_STATS['browser']} in the browser "
+          f"({FETCH_STATS['http_seconds']:.1f}s spent in HTTP requests)")
+    if HTTP_HEALTH['unavailable']:
+        print(f"🚧 HTTP was blocked, {FETCH_STATS['http_skipped']} pages went straight to the browser")
@@ -1,162 +1,71 @@
 import json
 import re
 import os
-import time
-from bs4 import BeautifulSoup
+from product_extractor import extract_page
+from page_store import save_page, content_digest
+from registry import DatasetRegistry
+from dataset_db import USE_DATABASE, DatasetDB, DatasetMismatch, db_path_for
+from ingredient_canon import CANONICALIZE, CanonIndex
+from ingredient_tokenizer import parse_ingredient_text
 from datetime import datetime
 from playwright.sync_api import sync_playwright
+from resource_blocking import BLOCK_RESOURCES, block_resources, count_transfer, new_blocking_stats, print_blocking_summary
+from readiness import wait_for_product_ready, print_ready_summary
+from browser_pool import SessionMissing, PageRecycler, open_context, print_recycler_summary
+from navigation import TransientNavigationError, goto, run_with_requeue, print_navigation_summary
+from telemetry import Trace, stage, print_telemetry_summary
 
 # Input and output files
 INPUT_JSON = "updated_product_data.json"  # Previous output JSON
 OUTPUT_JSON = "updated_product_data.json"
 REPORT_FILE = "ingredient_report.txt"
-DEBUG_DIR = "debug_html/"
 SESSION_FILE = "watsons_session.json"
 
-def split_ingredients(ingredient_text):
-    """Split ingredient text by commas, preserving commas within parentheses."""
-    ingredients = []
-    current = []
-    paren_count = 0
-    for char in ingredient_text:
-        if char == '(':
-            paren_count += 1
-        elif char == ')':
-            paren_count -= 1
-        elif char == ',' and paren_count == 0:
-            ingredients.append(''.join(current).strip())
-            current = []
-            continue
-        current.append(char)
-    if current:
-        ingredients.append(''.join(current).strip())
-    return [ing for ing in ingredients if ing]
-
-def parse_ingredients_from_html(html_content, product_code, product_id, source="web"):
-    """Parse ingredients from HTML content."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Initialize ingredient text
-    ingredient_text = ''
-    
-    # Try finding 'ส่วนประกอบ' or 'ส่วนผสม' in h4, h3, div, or span
-    headers = soup.find_all(['h4', 'h3', 'div', 'span'], string=re.compile(r'ส่วนประกอบ|ส่วนผสม'))
-    for header in headers:
-        next_element = header.find_next(['p', 'div', 'span'], class_=re.compile(r'ng-tns-c\d+-\d+ ng-star-inserted|description|product-details'))
-        if next_element:
-            ingredient_text = next_element.get_text(strip=True)
-            break
-    
-    # Fallback: Search for 'ส่วนประกอบ' or 'ส่วนผสม' in text and take the next element
-    if not ingredient_text:
-        sections = soup.find_all(string=re.compile(r'ส่วนประกอบ|ส่วนผสม'))
-        for section in sections:
-            parent = section.parent
-            next_sibling = parent.find_next_sibling(['p', 'div', 'span'])
-            if next_sibling:
-                ingredient_text = next_sibling.get_text(strip=True)
-                break
-            if parent.get_text(strip=True) and re.match(r'^[A-Z0-9\s\(\)\-\.\/,]*$', parent.get_text(strip=True)):
-                ingredient_text = parent.get_text(strip=True)
-                break
+def parse_ingredients_from_html(html_content, product_code, product_id, source="web", page_data=None):
+    """Parse ingredients from HTML content (or from extract_page's result for it, if given)."""
+    # Find the block after the 'ส่วนประกอบ'/'ส่วนผสม' header in a single pass over the page
+    if page_data is None:
+        page_data = extract_page(html_content, product_code)
+    ingredient_text = page_data['ingredient_block']
     
     print(f"Raw ingredient text for {product_code} (ID: {product_id}) from {source}: {ingredient_text[:200]}...")
     
     if not ingredient_text:
         with open(REPORT_FILE, 'a', encoding='utf-8') as f:
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            context = soup.find(string=re.compile(r'ส่วนประกอบ|ส่วนผสม'))
-            context_html = str(context.parent)[:500] if context else "No ingredient section found"
+            context_html = page_data['ingredient_context'] or "No ingredient section found"
             f.write(f"[{timestamp}] No ingredients found for product {product_code} (ID: {product_id}) from {source}. HTML context: {context_html}\n")
         print(f"❌ No ingredients found for {product_code} (ID: {product_id}) from {source}")
         return []
     
-    # Normalize to uppercase and filter out Thai characters
-    ingredient_text = ingredient_text.upper()
-    if re.search(r'[ป-ฮ]', ingredient_text):
-        ingredient_text = re.sub(r'[ป-ฮ]+', '', ingredient_text)
-    
-    # Split by commas first
-    raw_ings = split_ingredients(ingredient_text)
-    ingredients = []
-    
-    # For run-on text (no commas), split by space and group into chemical-like names
-    for raw_ing in raw_ings:
-        raw_ing = raw_ing.strip()
-        if not raw_ing:
-            continue
-        if ',' in raw_ing:
-            parts = [part.strip() for part in raw_ing.split(',') if part.strip()]
-            for part in parts:
-                word_count = len(re.split(r'\s+', part))
-                if word_count <= 4:
-                    ingredients.append(part)
-                else:
-                    words = re.split(r'\s+', part)
-                    temp_group = []
-                    for word in words:
-                        temp_group.append(word)
-                        if len(temp_group) >= 4 or re.search(r'(ACID|EXTRACT|ALCOHOL|POLYMER|BENZOATE|GLYCERIN|HYALURONATE|DIMETHYL|ETHYLHEXYL|TRIAZINE|PHENOL|DIMETHICONE|PEG|PPG|HYDROXY|CARBOMER|AMMONIUM|ACRYLATES|COPOLYMER|FRAGRANCE|PANTHENOL|ADENOSINE|EDTA|BUTYLENE|ALOE|CAMELLIA|SINENSIS|LEAF|HYDROLYZED|EXTENSIN|\d+,\d+-|BIS-|-OH|-YL|-IC|-ATE|-ONE|-INE|-ENE|-ANE|-OL|-ID|-IM|-AM|-UM|-ER)$', word.upper()):
-                            ingredients.append(' '.join(temp_group))
-                            temp_group = []
-                    if temp_group:
-                        ingredients.append(' '.join(temp_group))
-        else:
-            words = re.split(r'\s+', raw_ing)
-            current_group = []
-            for word in words:
-                word = word.strip()
-                if not word:
-                    continue
-                current_group.append(word)
-                if len(current_group) >= 1 and len(current_group) <= 4:
-                    if re.search(r'(ACID|EXTRACT|ALCOHOL|POLYMER|BENZOATE|GLYCERIN|HYALURONATE|DIMETHYL|ETHYLHEXYL|TRIAZINE|PHENOL|DIMETHICONE|PEG|PPG|HYDROXY|CARBOMER|AMMONIUM|ACRYLATES|COPOLYMER|FRAGRANCE|PANTHENOL|ADENOSINE|EDTA|BUTYLENE|ALOE|CAMELLIA|SINENSIS|LEAF|HYDROLYZED|EXTENSIN|\d+,\d+-|BIS-|-OH|-YL|-IC|-ATE|-ONE|-INE|-ENE|-ANE|-OL|-ID|-IM|-AM|-UM|-ER)$', word.upper()):
-                        ingredients.append(' '.join(current_group))
-                        current_group = []
-                    elif re.match(r'^[A-Z0-9]+(?:-[A-Z0-9]+)?$', word):
-                        continue
-                    else:
-                        ingredients.append(' '.join(current_group))
-                        current_group = []
-                else:
-                    ingredients.append(' '.join(current_group))
-                    current_group = []
-            if current_group:
-                ingredients.append(' '.join(current_group))
-    
-    # Filter English-only and ensure uniqueness
-    unique_ingredients = []
-    seen = set()
-    for ing in ingredients:
-        ing = ing.strip()
-        if ing and re.match(r'^[A-Z0-9\s\(\)\-\.\/,]*$', ing) and not re.search(r'[ป-ฮ]', ing):
-            word_count = len(re.split(r'\s+', ing))
-            if word_count <= 4:
-                ing_lower = ing.lower()
-                if ing_lower not in seen:
-                    seen.add(ing_lower)
-                    unique_ingredients.append(ing)
-    
+    unique_ingredients = parse_ingredient_text(ingredient_text)
     print(f"Parsed unique ingredients for {product_code} (ID: {product_id}) from {source}: {unique_ingredients}")
     return unique_ingredients
 
-def scrape_ingredients_from_web(page, url, product_code, product_id):
+def scrape_ingredients_from_web(page, url, product_code, product_id, trace=None):
     """Scrape ingredients from the Watsons website."""
     print(f"🌐 Navigating to {url} for product {product_code} (ID: {product_id})")
     try:
-        page.goto(url, timeout=30000)
-        page.wait_for_load_state('domcontentloaded', timeout=15000)
-        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        time.sleep(2)  # Wait for dynamic content
-        html = page.content()
+        with count_transfer(page, trace):
+            with stage(trace, 'navigate'):
+                goto(page, url, timeout=30000, trace=trace)
+            with stage(trace, 'ready'):
+                wait_for_product_ready(page, product_code, need_images=False)
+            with stage(trace, 'serialize'):
+                html = page.content()
         
-        # Save HTML for debugging
-        debug_file = os.path.join(DEBUG_DIR, f"debug_page_{product_code}_web.html")
-        with open(debug_file, 'w', encoding='utf-8') as f:
-            f.write(html)
-        print(f"📝 Saved web HTML to {debug_file}")
+        with stage(trace, 'parse'):
+            page_data = extract_page(html, product_code)
         
-        return parse_ingredients_from_html(html, product_code, product_id, source="web")
+        # Keep the raw page (compressed, deduplicated) for debugging and offline reparsing
+        with stage(trace, 'write'):
+            digest = save_page(product_code, html, source="web", content=content_digest(page_data))
+        print(f"📝 Saved web HTML to the page store ({digest[:12]})")
+        
+        with stage(trace, 'parse'):
+            return parse_ingredients_from_html(html, product_code, product_id, source="web", page_data=page_data)
+    except TransientNavigationError:
+        raise  # Still failing after retries: the caller re-queues it
     except Exception as e:
         with open(REPORT_FILE, 'a', encoding='utf-8') as f:
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -205,72 +114,60 @@ def main():
         print("✅ No failed products to process.")
         return
     
-    # Initialize ingredient map and ID counter
-    ingredient_map = {ing['name'].lower(): ing['id'] for ing in data['ingredient']}
-    next_ing_id = max([ing['id'] for ing in data['ingredient']], default=0) + 1
+    # Index ingredients by name and products by id
+    if USE_DATABASE:
+        # Each re-scraped product is written to the dataset's own database as soon as it is done
+        try:
+            registry = DatasetDB(db_path_for(OUTPUT_JSON), source=OUTPUT_JSON)
+            registry.seed(data)
+        except DatasetMismatch as e:
+            print(f"❌ {e}")
+            return
+        data = registry.export()
+        registry.canon = CanonIndex.from_dataset(data) if CANONICALIZE else None
+    else:
+        registry = DatasetRegistry(data, CanonIndex.from_dataset(data) if CANONICALIZE else None)
     new_failed_products = []
+    blocking_stats = new_blocking_stats()
     
     # Initialize Playwright
     with sync_playwright() as p:
-        browser = p.chromium.launch(
-            channel="msedge",
-            headless=False,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor'
-            ]
-        )
-        
-        # Load or create session
-        if os.path.exists(SESSION_FILE):
-            print("🔐 Loading saved session...")
-            context = browser.new_context(storage_state=SESSION_FILE)
-        else:
-            print("🔑 Creating new session with manual login...")
-            context = browser.new_context()
-            page = context.new_page()
-            page.goto("https://www.watsons.co.th/th/login")
-            print("⏳ Please log in manually in the browser window...")
-            print("👉 After successful login, press Enter to continue and save the session...")
-            input()
-            try:
-                page.wait_for_url("**/watsons.co.th/**", timeout=10000)
-                context.storage_state(path=SESSION_FILE)
-                print(f"✅ Session saved to {SESSION_FILE}")
-            except Exception as e:
-                print(f"❌ Login verification failed: {e}. Please try again.")
-                browser.close()
-                return
+        try:
+            browser, context = open_context(p, SESSION_FILE)
+        except SessionMissing as e:
+            print(f"❌ {e}")
+            return
         
-        page = context.new_page()
-        page.set_extra_http_headers({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0"
-        })
+        # One page, whose context is replaced when RSS goes over the watchdog's limit
+        pages = PageRecycler(browser, context, SESSION_FILE,
+                             on_context=lambda c: block_resources(c, blocking_stats) if BLOCK_RESOURCES else None)
         
-        # Process each failed product
-        for failed in failed_products:
+        def rescrape(failed):
             product_id = failed['id']
             product_code = failed['code']
             url = failed['url']
             
             # Find the product in JSON
-            product = next((p for p in data['product'] if p['id'] == product_id), None)
+            product = registry.product(product_id)
             if not product:
                 print(f"❌ Product ID {product_id} not found in JSON.")
                 new_failed_products.append(f"{url} (ID: {product_id}, Code: {product_code})")
-                continue
+                Trace(url).finish('no-product')
+                return
             
             print(f"\n--- Re-scraping product ID {product_id}: {product['name']} ({product_code}) from web ---")
             
-            # Clear existing ingredients
-            product['ingredient'] = []
-            
-            # Scrape ingredients from web
-            parsed_ings = scrape_ingredients_from_web(page, url, product_code, product_id)
+            # Scrape ingredients from web (a page that can't be loaded yet is re-queued with its ingredients untouched)
+            trace = Trace(url)
+            try:
+                parsed_ings = scrape_ingredients_from_web(pages.page, url, product_code, product_id, trace)
+            except TransientNavigationError:
+                trace.finish('requeued')
+                raise
             
             # If no ingredients found, use a default ingredient
-            if not parsed_ings:
+            found = bool(parsed_ings)
+            if not found:
                 parsed_ings = ["UNKNOWN"]
                 with open(REPORT_FILE, 'a', encoding='utf-8') as f:
                     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -278,34 +175,39 @@ def main():
                 print(f"⚠️ Using default ingredient 'UNKNOWN' for {product_code} (ID: {product_id})")
             
             # Map ingredients to IDs
-            product_ing_ids = []
-            for ing in parsed_ings:
-                ing_lower = ing.lower()
-                if ing_lower in ingredient_map:
-                    product_ing_ids.append(ingredient_map[ing_lower])
-                else:
-                    new_ing = {
-                        'id': next_ing_id,
-                        'name': ing,
-                        'allergic': False,
-                        'allergic-relation': None
-                    }
-                    data['ingredient'].append(new_ing)
-                    ingredient_map[ing_lower] = next_ing_id
-                    product_ing_ids.append(next_ing_id)
-                    next_ing_id += 1
+            with trace.stage('ingredients'):
+                product_ing_ids = registry.ingredient_ids(parsed_ings)
             
             product['ingredient'] = product_ing_ids
+            with trace.stage('write'):
+                registry.put_product(product, product_id)
             print(f"Updated product ID {product_id} with {len(product_ing_ids)} ingredient IDs from web")
+            trace.finish('parsed' if found else 'failed', ingredients=len(product_ing_ids))
             
             if not product_ing_ids:
                 new_failed_products.append(f"{url} (ID: {product_id}, Code: {product_code})")
         
+        # Process each failed product; pages that keep failing go to the back of the queue
+        for failed in run_with_requeue(failed_products, rescrape, after=pages.page_done):
+            with open(REPORT_FILE, 'a', encoding='utf-8') as f:
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                f.write(f"[{timestamp}] Web scraping failed for product {failed['code']} (ID: {failed['id']}) at {failed['url']}: page could not be loaded\n")
+            new_failed_products.append(f"{failed['url']} (ID: {failed['id']}, Code: {failed['code']})")
+        
         browser.close()
+    print_ready_summary()
+    print_blocking_summary(blocking_stats)
+    print_navigation_summary()
+    print_telemetry_summary()
+    print_recycler_summary(pages)
     
     # Save the updated JSON
+    if USE_DATABASE:
+        data = registry.export()
     with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=4)
+    if USE_DATABASE:
+        registry.mark_synced()
     
     # Log new failed products to ingredient_report.txt
     with open(REPORT_FILE, 'a', encoding='utf-8') as f:
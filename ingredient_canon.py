@@ -0,0 +1,213 @@
+from collections import Counter, defaultdict
+import json
+import re
+import sys
+import time
+
+INPUT_JSON = "updated_product_data.json"
+OUTPUT_JSON = "canonical_product_data.json"
+CANONICALIZE = True  # Scrapers map new ingredient names onto known spellings before interning them
+
+# Fuzzy matching only folds a rarely used spelling into a much more common one. Real INCI names
+# are often one letter apart (CERAMIDE AP/NP, SODIUM SULFATE/SULFITE), so the support guards
+# matter more than the edit distance itself.
+MAX_VARIANT_SUPPORT = 2  # A name used by more products than this is taken as spelled on purpose
+MIN_CANONICAL_SUPPORT = 5  # A fuzzy target must be used by at least this many products...
+SUPPORT_RATIO = 5  # ...and by this many times more products than the variant
+MIN_FUZZY_LENGTH = 8  # Shorter keys only match exactly; one edit is too much of them
+LONG_KEY_LENGTH = 16  # Keys at least this long may be two edits away instead of one
+GRAM = 3
+
+SEPARATOR_RE = re.compile(r'[^A-Z0-9]+')
+INNER_SPACE_RE = re.compile(r'(?<!\d) | (?!\d)')  # Spaces not separating two numbers
+COLOR_INDEX_RE = re.compile(r'^C[IL]?(?=\d{5})')  # "CI 77891", "CL 77891", "C 77891", "CI77891"
+LETTER_RE = re.compile(r'[A-Z]')
+DIGIT_RE = re.compile(r'\d')
+
+def normalize_name(name):
+    """Spelling-insensitive key of an ingredient name.
+
+    Case, punctuation, brackets and spacing are ignored, except that spaces
+    between two numbers are kept ("PEG/PPG-10/1" is not "PEG/PPG-101").
+    """
+    key = SEPARATOR_RE.sub(' ', name.upper()).strip()
+    key = INNER_SPACE_RE.sub('', key)
+    return COLOR_INDEX_RE.sub('CI', key)
+
+def grams(key):
+    padded = f"^{key}$"
+    return {padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1)}
+
+def max_distance(key):
+    """How many edits a key may be from its canonical spelling."""
+    if len(key) < MIN_FUZZY_LENGTH or DIGIT_RE.search(key):
+        return 0  # Numbers are the identity of PEG-100, CI 77491, POLYQUATERNIUM-7...
+    return 2 if len(key) >= LONG_KEY_LENGTH else 1
+
+def bounded_distance(a, b, bound):
+    """Levenshtein distance of a and b, or bound + 1 as soon as it must exceed bound."""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        best = i
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            current.append(cost)
+            if cost < best:
+                best = cost
+        if best > bound:
+            return bound + 1
+        previous = current
+    return previous[-1]
+
+class CanonIndex:
+    """Maps raw ingredient names to one canonical spelling each.
+
+    Lookups go exact name -> normalized key -> bounded edit distance over
+    a trigram index of the well-supported names, and every answer is cached.
+    """
+
+    def __init__(self):
+        self.names = {}  # normalized key -> canonical display name
+        self.support = Counter()  # normalized key -> number of products using it
+        self._cache = {}  # raw name -> canonical name
+        self._gram_index = defaultdict(set)  # trigram -> keys eligible as fuzzy targets
+        self._indexed = set()
+
+    @classmethod
+    def from_dataset(cls, data):
+        """Index every ingredient of a dataset, weighted by how many products use it."""
+        index = cls()
+        used = Counter(i for product in data['product'] for i in set(product['ingredient']))
+        # Most used spelling first, so it becomes the display name of its key
+        for ing in sorted(data['ingredient'], key=lambda ing: (-used[ing['id']], ing['id'])):
+            index.add(ing['name'], used[ing['id']])
+        return index
+
+    def add(self, name, support=1):
+        """Record name as used by `support` more products; returns its key."""
+        key = normalize_name(name)
+        self.names.setdefault(key, name)
+        self.support[key] += support
+        if (key not in self._indexed and self.support[key] >= MIN_CANONICAL_SUPPORT
+                and max_distance(key)):
+            self._indexed.add(key)
+            for gram in grams(key):
+                self._gram_index[gram].add(key)
+        return key
+
+    def fuzzy_key(self, key, support=0):
+        """Best-supported indexed key within the edit bound of key, or None."""
+        bound = max_distance(key)
+        if not bound or support > MAX_VARIANT_SUPPORT:
+            return None
+        query = grams(key)
+        shared = Counter()
+        for gram in query:
+            for candidate in self._gram_index.get(gram, ()):
+                shared[candidate] += 1
+        # Each edit destroys at most GRAM grams, so fewer shared grams rule a candidate out
+        needed = len(query) - GRAM * bound
+        best = None
+        for candidate, count in shared.items():
+            if count < needed or candidate == key or candidate[0] != key[0]:
+                continue
+            short, long_ = sorted((key, candidate), key=len)
+            if long_.startswith(short) or long_.endswith(short):
+                continue  # An extra word or prefix (GLYCERYL STEARATE SE, DIMETHICONE) is no typo
+            if self.support[candidate] < max(MIN_CANONICAL_SUPPORT, SUPPORT_RATIO * support):
+                continue
+            distance = bounded_distance(key, candidate, bound)
+            if distance <= bound:
+                rank = (distance, -self.support[candidate], candidate)
+                if best is None or rank < best:
+                    best = rank
+        return best[2] if best else None
+
+    def resolve(self, name):
+        """Canonical spelling for a raw name; unseen names become canonical themselves."""
+        canonical = self._cache.get(name)
+        if canonical is None:
+            key = normalize_name(name)
+            # Known but rare spellings may be typos of a common one, just like unseen ones
+            key = self.fuzzy_key(key, self.support[key]) or (key if key in self.names else self.add(name))
+            canonical = self._cache[name] = self.names[key]
+        return canonical
+
+def canonicalize_dataset(data, index=None):
+    """Fold every ingredient into its canonical spelling, in one batch over the whole table.
+
+    Returns (dataset, merges, dropped). Merged ingredients keep the lowest id
+    among them and the canonical name, products and users point at it, and
+    allergy flags are combined. Fragments without a single letter ("1.", "6).") are dropped.
+    """
+    index = index or CanonIndex.from_dataset(data)
+    canonical_key = {}
+    merges = []
+    for key, name in index.names.items():
+        target = index.fuzzy_key(key, index.support[key])
+        canonical_key[key] = target or key
+        if target:
+            merges.append((name, index.names[target]))
+
+    keep = {}  # canonical key -> surviving ingredient
+    new_id = {}
+    dropped = []
+    for ing in data['ingredient']:
+        key = canonical_key[normalize_name(ing['name'])]
+        if not LETTER_RE.search(key):
+            dropped.append(ing['name'])
+            new_id[ing['id']] = None
+            continue
+        if key not in keep:
+            keep[key] = dict(ing, name=index.names[key])
+        new_id[ing['id']] = keep[key]['id']
+
+    def remap(ids):
+        return list(dict.fromkeys(new_id[i] for i in ids if new_id.get(i) is not None))
+
+    ingredients = list(keep.values())
+    merged_flags = defaultdict(lambda: [False, set()])
+    for ing in data['ingredient']:
+        target = new_id[ing['id']]
+        if target is None:
+            continue
+        flags = merged_flags[target]
+        flags[0] = flags[0] or ing['allergic']
+        flags[1].update(remap(ing['allergic-relation'] or []))
+    for ing in ingredients:
+        allergic, relation = merged_flags[ing['id']]
+        relation.discard(ing['id'])
+        ing['allergic'] = allergic
+        ing['allergic-relation'] = sorted(relation) or None
+
+    dataset = dict(data)
+    dataset['ingredient'] = ingredients
+    dataset['product'] = [dict(p, ingredient=remap(p['ingredient'])) for p in data['product']]
+    dataset['user'] = [dict(u, allergic=remap(u['allergic'])) for u in data.get('user', [])]
+    return dataset, merges, dropped
+
+def main():
+    input_path = sys.argv[1] if len(sys.argv) > 1 else INPUT_JSON
+    output_path = sys.argv[2] if len(sys.argv) > 2 else OUTPUT_JSON
+    with open(input_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    start = time.perf_counter()
+    dataset, merges, dropped = canonicalize_dataset(data)
+    seconds = time.perf_counter() - start
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(dataset, f, ensure_ascii=False, indent=4)
+    for variant, canonical in sorted(merges):
+        print(f"🔗 {variant} -> {canonical}")
+    if dropped:
+        print(f"🗑️ Dropped {len(dropped)} fragments without letters: {dropped}")
+    print(f"✅ {len(data['ingredient'])} -> {len(dataset['ingredient'])} ingredients in {seconds * 1000:.0f} ms "
+          f"({len(merges)} fuzzy merges)")
+    print(f"✅ Saved data to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import re
+
+# A word ending in one of these closes the ingredient name being assembled from a run-on list
+NAME_END_SUFFIXES = (
+    'ACID', 'EXTRACT', 'ALCOHOL', 'POLYMER', 'BENZOATE', 'GLYCERIN', 'HYALURONATE', 'DIMETHYL',
+    'ETHYLHEXYL', 'TRIAZINE', 'PHENOL', 'DIMETHICONE', 'PEG', 'PPG', 'HYDROXY', 'CARBOMER',
+    'AMMONIUM', 'ACRYLATES', 'COPOLYMER', 'FRAGRANCE', 'PANTHENOL', 'ADENOSINE', 'EDTA', 'BUTYLENE',
+    'ALOE', 'CAMELLIA', 'SINENSIS', 'LEAF', 'HYDROLYZED', 'EXTENSIN', 'BIS-', '-OH', '-YL', '-IC',
+    '-ATE', '-ONE', '-INE', '-ENE', '-ANE', '-OL', '-ID', '-IM', '-AM', '-UM', '-ER',
+)
+LOCANT_END_RE = re.compile(r'\d+,\d+-$')  # e.g. "1,2-" in "1,2-HEXANEDIOL" split across words
+NAME_PART_RE = re.compile(r'[A-Z0-9]+(?:-[A-Z0-9]+)?')  # Bare code-like word that continues a name
+DELIMITER_RE = re.compile(r'[(),]')
+THAI_RE = re.compile(r'[ป-ฮ]+')
+ENGLISH_NAME_RE = re.compile(r'[A-Z0-9\s\(\)\-\.\/,]*')
+MAX_NAME_WORDS = 4
+
+def split_ingredients(ingredient_text):
+    """Split ingredient text by commas, preserving commas within parentheses."""
+    if '(' not in ingredient_text and ')' not in ingredient_text:
+        return [ing for ing in (part.strip() for part in ingredient_text.split(',')) if ing]
+    # Only visit the delimiters instead of every character
+    ingredients = []
+    paren_count = 0
+    start = 0
+    for match in DELIMITER_RE.finditer(ingredient_text):
+        char = match.group()
+        if char == '(':
+            paren_count += 1
+        elif char == ')':
+            paren_count -= 1
+        elif paren_count == 0:
+            ingredients.append(ingredient_text[start:match.start()].strip())
+            start = match.end()
+    ingredients.append(ingredient_text[start:].strip())
+    return [ing for ing in ingredients if ing]
+
+def ends_name(word):
+    """True if word looks like the last word of an ingredient name."""
+    if word.endswith(NAME_END_SUFFIXES):
+        return True
+    return word.endswith('-') and LOCANT_END_RE.search(word) is not None
+
+def _group_words(words, out):
+    """Assemble run-on words into names of up to MAX_NAME_WORDS, closing a name at a name-ending word."""
+    group = []
+    for word in words:
+        group.append(word)
+        if ends_name(word) or (not NAME_PART_RE.fullmatch(word)) or len(group) > MAX_NAME_WORDS:
+            out.append(' '.join(group))
+            group = []
+    if group:
+        out.append(' '.join(group))
+
+def _chunk_words(words, out):
+    """Cut an over-long comma-separated entry into names of up to MAX_NAME_WORDS words."""
+    group = []
+    for word in words:
+        group.append(word)
+        if len(group) >= MAX_NAME_WORDS or ends_name(word):
+            out.append(' '.join(group))
+            group = []
+    if group:
+        out.append(' '.join(group))
+
+def parse_ingredient_text(ingredient_text):
+    """Split a raw ingredient block into unique, English-only ingredient names."""
+    # Normalize to uppercase and filter out Thai characters
+    ingredient_text = THAI_RE.sub('', ingredient_text.upper())
+
+    ingredients = []
+    for raw_ing in split_ingredients(ingredient_text):
+        if ',' in raw_ing:
+            # Only commas inside parentheses are left here
+            for part in raw_ing.split(','):
+                words = part.split()
+                if not words:
+                    continue
+                if len(words) <= MAX_NAME_WORDS:
+                    ingredients.append(part.strip())
+                else:
+                    _chunk_words(words, ingredients)
+        else:
+            # Run-on text (no commas): group words into chemical-like names
+            _group_words(raw_ing.split(), ingredients)
+
+    # Filter English-only and ensure uniqueness
+    unique_ingredients = []
+    seen = set()
+    for ing in ingredients:
+        ing = ing.strip()
+        if ing and ENGLISH_NAME_RE.fullmatch(ing) and len(ing.split()) <= MAX_NAME_WORDS:
+            ing_lower = ing.lower()
+            if ing_lower not in seen:
+                seen.add(ing_lower)
+                unique_ingredients.append(ing)
+    return unique_ingredients
@@ -0,0 +1,140 @@
+from crawl_engine import run_crawl, CONCURRENCY, CONTEXTS, PER_HOST_LIMIT
+from resource_blocking import BLOCK_RESOURCES, block_resources_async, new_blocking_stats, print_blocking_summary
+from navigation import goto_async, print_navigation_summary
+from bulk_extract import collect_async, print_bulk_summary
+from dataset import extract_bp_number
+from urllib.parse import quote
+import asyncio
+import csv
+import os
+import sys
+import time
+
+SESSION_FILE = "watsons_session.json"
+QUEUE_CSV = "final_test.csv"  # The crawl queue scrap_resurcive_filter.py reads (URL, Types)
+BASE_URL = "https://www.watsons.co.th"
+SEARCH_URL = BASE_URL + "/th/search?text={}&useDefaultSearch=false&brandRedirect=true"
+LINK_SELECTOR = 'a.ClickSearchResultEvent_Class.gtmAlink'
+SCROLL_TIMEOUT = 4000  # ms to wait for new result links after a scroll before calling it the end
+MAX_SCROLLS = 50  # Safety cap per search
+
+# (search text or category/search URL, Types) pairs; a CSV with Query,Types columns can be given instead
+SEARCHES = [
+    ("ยาสระผม", "Shampoo"),
+    ("ครีมกันแดด", "Sunscreen"),
+    ("โฟมล้างหน้า", "facial cleansing foam"),
+    ("สบู่", "Soap"),
+    ("ครีมบำรุงผิวกาย", "Body cream"),
+]
+
+LINK_COUNT_SCRIPT = f"() => document.querySelectorAll('{LINK_SELECTOR}').length"
+MORE_LINKS_SCRIPT = f"n => document.querySelectorAll('{LINK_SELECTOR}').length > n"
+SCROLL_SCRIPT = f"""() => {{
+    const links = document.querySelectorAll('{LINK_SELECTOR}');
+    if (links.length) links[links.length - 1].scrollIntoView();
+    window.scrollTo(0, document.body.scrollHeight);
+}}"""
+
+def search_url(query):
+    """A search URL for query, or query itself if it already is a URL."""
+    return query if query.startswith('http') else SEARCH_URL.format(quote(query))
+
+def load_searches(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [(row['Query'].strip(), row['Types'].strip()) for row in csv.DictReader(f)]
+
+class CrawlQueue:
+    """The crawl queue CSV, appended to as links are discovered, deduplicated on BP number."""
+
+    def __init__(self, path=QUEUE_CSV):
+        self.path = path
+        self.seen = set()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.seen = {extract_bp_number(row['URL']) for row in csv.DictReader(f)}
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        if new_file:
+            self.writer.writerow(['URL', 'Types'])
+
+    def add(self, links, types):
+        """Append the links not queued yet; returns how many were new."""
+        added = 0
+        for url in links:
+            bp_number = extract_bp_number(url)
+            if bp_number and bp_number not in self.seen:
+                self.seen.add(bp_number)
+                self.writer.writerow([url, types])
+                added += 1
+        self.file.flush()
+        return added
+
+    def close(self):
+        self.file.close()
+
+async def scroll_to_end(page):
+    """Scroll until no new result links appear; returns how many scrolls loaded more."""
+    count = await page.evaluate(LINK_COUNT_SCRIPT)
+    for scrolls in range(MAX_SCROLLS):
+        await page.evaluate(SCROLL_SCRIPT)
+        try:
+            await page.wait_for_function(MORE_LINKS_SCRIPT, arg=count, timeout=SCROLL_TIMEOUT)
+        except Exception:
+            return scrolls  # Nothing new within the timeout: end of results
+        count = await page.evaluate(LINK_COUNT_SCRIPT)
+    return MAX_SCROLLS
+
+async def discover_links(page, url):
+    """Product links of every result of one search, after scrolling it to the end."""
+    await goto_async(page, url, timeout=30000)
+    try:
+        await page.wait_for_selector(LINK_SELECTOR, timeout=10000)
+    except Exception:
+        print(f"⚠️ No results on {url}")
+        return []
+    scrolls = await scroll_to_end(page)
+    links = []
+    for row in await collect_async(page, LINK_SELECTOR, spec={'href': 'href'}):
+        href = row['href']
+        if href:
+            full_url = BASE_URL + href if href.startswith('/') else href
+            if '/p/BP_' in full_url:
+                links.append(full_url)
+    print(f"🔍 {len(links)} product links after {scrolls} scroll(s) on {url}")
+    return list(dict.fromkeys(links))
+
+def main():
+    searches = load_searches(sys.argv[1]) if len(sys.argv) > 1 else SEARCHES
+    queue = CrawlQueue()
+    jobs = [{'url': search_url(query), 'types': types} for query, types in searches]
+    found = {'links': 0, 'new': 0}
+
+    async def handle(page, job):
+        links = await discover_links(page, job['url'])
+        added = queue.add(links, job['types'])  # Handlers run on the event loop thread, no lock needed
+        found['links'] += len(links)
+        found['new'] += added
+        print(f"✅ {job['types']}: {added} new of {len(links)} links queued")
+
+    blocking_stats = new_blocking_stats()
+
+    async def setup_context(context):
+        if BLOCK_RESOURCES:
+            await block_resources_async(context, blocking_stats)
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(run_crawl(jobs, handle, concurrency=CONCURRENCY, contexts=CONTEXTS,
+                              per_host=PER_HOST_LIMIT, session_file=SESSION_FILE,
+                              on_context=setup_context))
+    finally:
+        queue.close()
+    print(f"🎉 {found['new']} new product links added to {QUEUE_CSV} "
+          f"({found['links']} found over {len(jobs)} searches in {time.perf_counter() - start:.1f}s)")
+    print_blocking_summary(blocking_stats)
+    print_bulk_summary()
+    print_navigation_summary()
+
+if __name__ == "__main__":
+    main()
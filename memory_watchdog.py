@@ -0,0 +1,114 @@
+import os
+
+RSS_LIMIT_MB = int(os.environ.get('CRAWLER_RSS_LIMIT_MB', 2048))  # Crawler + browser processes together
+RSS_CHECK_EVERY = 10  # Pages between RSS readings
+REPORT_EVERY = 100  # Pages per peak-memory report line
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+# `python browser_pool.py serve` records its pid here. Crawlers attached to it over CDP don't own its
+# browser processes, so they are measured through this pid instead of as descendants.
+SERVE_PID_FILE = "browser_pool.pid"
+
+def _children():
+    """Map pid -> child pids for every process in /proc."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:
+            continue  # Exited while we were looking
+        # The command name is in parentheses and may contain spaces; the ppid follows it
+        ppid = int(stat[stat.rindex(b')') + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+def _rss_bytes(pid):
+    try:
+        with open(f'/proc/{pid}/statm', 'rb') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return 0
+
+def served_pid(pid_file=SERVE_PID_FILE):
+    """Pid of the running browser pool service, or None."""
+    try:
+        with open(pid_file, 'r', encoding='utf-8') as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+    return pid if os.path.exists(f'/proc/{pid}') else None
+
+def crawler_roots():
+    """This process, plus the pool service whose browser it attaches to when one is running."""
+    pid = served_pid()
+    return [os.getpid()] + ([pid] if pid and pid != os.getpid() else [])
+
+def tree_rss_mb(roots=None):
+    """Resident memory of processes and all their descendants (the Playwright driver and every
+    browser process it started), in MB. None where /proc isn't available."""
+    if not os.path.isdir('/proc'):
+        return None
+    children = _children()
+    total = 0
+    seen = set()
+    stack = list(roots or crawler_roots())
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        total += _rss_bytes(pid)
+        stack.extend(children.get(pid, ()))
+    return total / 1024 / 1024
+
+class MemoryWatchdog:
+    """Samples the crawler's RSS every few pages, flags when it crosses the limit and keeps
+    the peak for every REPORT_EVERY pages.
+
+    The crawler's RSS is its own process tree plus, when one is running, the pool
+    service's tree (see crawler_roots), since that is where an attached crawler's pages live.
+    """
+
+    def __init__(self, limit_mb=RSS_LIMIT_MB):
+        self.limit_mb = limit_mb
+        self.pages = 0
+        self.window_peak = 0.0
+        self.peak = 0.0
+        self.windows = []  # (first page, last page, peak MB)
+        self.over_limit = 0
+
+    def page_done(self):
+        """Count a page; returns True when a reading shows RSS over the limit."""
+        self.pages += 1
+        over = False
+        if self.pages % RSS_CHECK_EVERY == 0:
+            rss = tree_rss_mb()
+            if rss is not None:
+                self.window_peak = max(self.window_peak, rss)
+                self.peak = max(self.peak, rss)
+                if rss > self.limit_mb:
+                    self.over_limit += 1
+                    print(f"🧯 RSS {rss:.0f} MB is over the {self.limit_mb} MB limit")
+                    over = True
+        if self.pages % REPORT_EVERY == 0:
+            self._close_window()
+        return over
+
+    def _close_window(self):
+        first = self.windows[-1][1] + 1 if self.windows else 1
+        if self.pages >= first and self.window_peak:
+            self.windows.append((first, self.pages, self.window_peak))
+            print(f"📈 Pages {first}-{self.pages}: peak RSS {self.window_peak:.0f} MB")
+        self.window_peak = 0.0
+
+def print_memory_summary(watchdog):
+    if watchdog.pages % REPORT_EVERY:
+        watchdog._close_window()
+    if not watchdog.peak:
+        return
+    print(f"📈 Peak RSS {watchdog.peak:.0f} MB over {watchdog.pages} pages "
+          f"(limit {watchdog.limit_mb} MB, crossed {watchdog.over_limit} times)")
+    for first, last, peak in watchdog.windows:
+        print(f"   pages {first}-{last}: {peak:.0f} MB")
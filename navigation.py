@@ -0,0 +1,218 @@
+from rate_limiter import ADAPTIVE_RATE, host_key, limiter_for, is_throttled, print_rate_summary
+from collections import deque
+import asyncio
+import random
+import threading
+import time
+
+MAX_ATTEMPTS = 3  # Navigations tried per call before the job is handed back for re-queueing
+BACKOFF_BASE = 1.0  # Seconds; attempt n waits a random time up to BACKOFF_BASE * 2**n
+BACKOFF_CAP = 30.0
+BREAKER_THRESHOLD = 5  # Consecutive failures on one host that open its breaker
+BREAKER_COOLDOWN = 30.0  # Seconds an open breaker holds every navigation to that host
+PROBE_POLL = 0.5  # Seconds between checks while another navigation is probing a half-open breaker
+PROBE_TIMEOUT = 90.0  # Seconds after which a probe that never reported back no longer holds the others
+REQUEUE_ROUNDS = 2  # Times a job that still failed is put back at the end of the queue
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+GIVE_UP_STATUSES = {404, 410}
+
+NAV_STATS = {'navigations': 0, 'retries': 0, 'requeued': 0, 'breaker_trips': 0, 'breaker_wait': 0.0, 'failed': 0}
+
+class TransientNavigationError(Exception):
+    """Navigation kept failing in a way that may pass (timeouts, network errors, 5xx, 429)."""
+
+class PermanentNavigationError(Exception):
+    """The page is gone (404/410); retrying won't help."""
+
+class CircuitBreaker:
+    """Opens after a burst of consecutive failures on one host and holds navigations there for a cooldown.
+
+    After the cooldown one navigation is let through (half-open) while the
+    others keep waiting: success closes the breaker, failure opens it again
+    straight away.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self.tripped = False
+        self.probe_until = 0.0  # While in the future, a half-open probe is in flight
+        self.lock = threading.Lock()  # The HTTP fetch threads share breakers with the browser
+
+    def wait_time(self):
+        """Seconds a navigation should wait before asking again; 0 lets it through.
+
+        Once the cooldown is over, the first caller becomes the probe and
+        everyone else waits until it reports back.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.open_until > now:
+                return self.open_until - now
+            if not self.tripped:
+                return 0.0
+            if self.probe_until > now:
+                return PROBE_POLL
+            self.probe_until = now + PROBE_TIMEOUT
+            return 0.0
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.tripped = False
+            self.probe_until = 0.0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probe_until = 0.0
+            if self.failures >= self.threshold:
+                if not self.tripped or self.open_until <= time.monotonic():
+                    NAV_STATS['breaker_trips'] += 1
+                    print(f"🔌 Circuit open after {self.failures} failures, pausing for {self.cooldown:.0f}s")
+                self.open_until = time.monotonic() + self.cooldown
+                self.tripped = True
+                self.failures = self.threshold - 1  # Half-open: the next failure re-opens it
+
+BREAKERS = {}  # host (plus backend, if not the browser) -> CircuitBreaker
+
+def breaker_for(url, backend=None):
+    key = host_key(url, backend)
+    if key not in BREAKERS:
+        BREAKERS.setdefault(key, CircuitBreaker())  # setdefault: two fetch threads may get here at once
+    return BREAKERS[key]
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff, so retrying pages don't hit the site in lockstep."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def _check(response, url):
+    """Raise for statuses that mean the navigation didn't get the page.
+
+    A bot wall (403, or a redirect to a captcha/blocked/challenge URL) is
+    retried like a 5xx, so its page is never parsed as the product.
+    """
+    status = response.status if response is not None else None
+    if status in GIVE_UP_STATUSES:
+        raise PermanentNavigationError(f"{url} returned {status}")
+    if status in RETRY_STATUSES:
+        raise TransientNavigationError(f"{url} returned {status}")
+    if is_throttled(response):
+        raise TransientNavigationError(f"{url} was blocked ({status} at {response.url})")
+
+def wait_for_breaker(breaker):
+    """Sleep until the breaker lets a request through."""
+    wait = breaker.wait_time()
+    while wait:
+        NAV_STATS['breaker_wait'] += wait
+        time.sleep(wait)
+        wait = breaker.wait_time()
+
+def _failed(breaker, url, attempt, error):
+    """Record a failed attempt; returns the delay before the next one, or raises once attempts run out."""
+    breaker.record_failure()
+    if attempt + 1 >= MAX_ATTEMPTS:
+        NAV_STATS['failed'] += 1
+        raise TransientNavigationError(f"{url} failed {MAX_ATTEMPTS} times: {error}") from error
+    NAV_STATS['retries'] += 1
+    delay = backoff_delay(attempt)
+    print(f"🔁 Retrying {url} in {delay:.1f}s ({error})")
+    return delay
+
+def goto(page, url, timeout=30000, trace=None, **kwargs):
+    """page.goto paced by the host's rate limiter, with bounded retries, jittered backoff and its circuit breaker.
+
+    Retries are also counted on trace (a telemetry.Trace), if given.
+    """
+    breaker = breaker_for(url)
+    limiter = limiter_for(url)
+    for attempt in range(MAX_ATTEMPTS):
+        wait_for_breaker(breaker)
+        if ADAPTIVE_RATE:
+            limiter.acquire()
+        NAV_STATS['navigations'] += 1
+        start = time.monotonic()
+        try:
+            response = page.goto(url, timeout=timeout, **kwargs)
+            limiter.record(time.monotonic() - start, is_throttled(response))
+            _check(response, url)
+        except PermanentNavigationError:
+            breaker.record_success()  # The site answered; the page just isn't there
+            raise
+        except Exception as e:
+            if not isinstance(e, TransientNavigationError):
+                limiter.record(time.monotonic() - start, throttled=True)  # Timeouts and network errors
+            time.sleep(_failed(breaker, url, attempt, e))
+            if trace is not None:
+                trace.retries += 1
+            continue
+        breaker.record_success()
+        return response
+
+async def goto_async(page, url, timeout=30000, trace=None, **kwargs):
+    """Async twin of goto."""
+    breaker = breaker_for(url)
+    limiter = limiter_for(url)
+    for attempt in range(MAX_ATTEMPTS):
+        wait = breaker.wait_time()
+        while wait:
+            NAV_STATS['breaker_wait'] += wait
+            await asyncio.sleep(wait)
+            wait = breaker.wait_time()
+        if ADAPTIVE_RATE:
+            await limiter.acquire_async()
+        NAV_STATS['navigations'] += 1
+        start = time.monotonic()
+        try:
+            response = await page.goto(url, timeout=timeout, **kwargs)
+            limiter.record(time.monotonic() - start, is_throttled(response))
+            _check(response, url)
+        except PermanentNavigationError:
+            breaker.record_success()
+            raise
+        except Exception as e:
+            if not isinstance(e, TransientNavigationError):
+                limiter.record(time.monotonic() - start, throttled=True)
+            await asyncio.sleep(_failed(breaker, url, attempt, e))
+            if trace is not None:
+                trace.retries += 1
+            continue
+        breaker.record_success()
+        return response
+
+def run_with_requeue(jobs, process, rounds=REQUEUE_ROUNDS, after=None):
+    """Call process(job) for every job; jobs raising TransientNavigationError go to the back of the queue.
+
+    Each job is re-queued at most `rounds` times, so by the time it comes
+    round again the site has had the rest of the queue's time to recover.
+    after(), if given, is called once every attempt is over (e.g.
+    PageRecycler.page_done). Returns the jobs that still failed.
+    """
+    queue = deque((job, 0) for job in jobs)
+    failed = []
+    while queue:
+        job, requeued = queue.popleft()
+        try:
+            process(job)
+        except TransientNavigationError as e:
+            if requeued < rounds:
+                NAV_STATS['requeued'] += 1
+                print(f"↩️ Re-queueing after: {e}")
+                queue.append((job, requeued + 1))
+            else:
+                print(f"❌ Giving up: {e}")
+                failed.append(job)
+        finally:
+            if after:
+                after()
+    return failed
+
+def print_navigation_summary():
+    if not NAV_STATS['navigations']:
+        return
+    print(f"🧭 Navigation: {NAV_STATS['navigations']} navigations, {NAV_STATS['retries']} retries, "
+          f"{NAV_STATS['requeued']} re-queued, {NAV_STATS['failed']} ran out of {MAX_ATTEMPTS} attempts, "
+          f"{NAV_STATS['breaker_trips']} breaker trips ({NAV_STATS['breaker_wait']:.0f}s held)")
+    print_rate_summary()
@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+
+STREAM_OUTPUT = True  # Scrapers write each product to an NDJSON stream as it is parsed, then compact it to JSON
+TABLES = ('user', 'ingredient', 'category', 'product')  # Key order of the legacy JSON files
+
+# One line per row, in the order the scraper produced them:
+#   {"table": "ingredient", "row": {"id": 12, "name": "GLYCERIN", ...}}
+#   {"table": "product", "row": {"id": 3, "name": ..., "ingredient": [12, ...], ...}}
+# A row may appear again later (a re-scraped product); the last copy wins and keeps the
+# position of the first, just like replacing it in the in-memory dataset would.
+
+class NdjsonWriter:
+    """Writes dataset rows to an NDJSON file as they are produced, flushing every line.
+
+    The stream starts with every row of the dataset the run starts from, so
+    it can be compacted on its own, and is readable mid-run by iter_rows.
+    """
+
+    def __init__(self, path, data):
+        self.path = path
+        self.file = open(path, 'w', encoding='utf-8')
+        for table in TABLES:
+            for row in data.get(table, []):
+                self.write(table, row)
+
+    def write(self, table, row):
+        self.file.write(json.dumps({'table': table, 'row': row}, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def iter_rows(path):
+    """Yield (table, row) for every line of an NDJSON stream; a torn last line is ignored."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            yield record['table'], record['row']
+
+def _indent(text, spaces):
+    return text.replace('\n', '\n' + ' ' * spaces)
+
+def compact(path, output_path):
+    """Write the legacy nested JSON (as json.dump(obj, indent=4) would) from an NDJSON stream.
+
+    Only the byte offset of each row's latest copy is kept in memory; rows are
+    re-read one at a time while writing, so memory does not grow with row size.
+    """
+    latest = {table: {} for table in TABLES}  # table -> {row id: offset}, in first-seen order
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            latest.setdefault(record['table'], {})[record['row']['id']] = offset
+            offset += len(line)
+
+    tmp_path = f"{output_path}.tmp"
+    with open(path, 'rb') as src, open(tmp_path, 'w', encoding='utf-8') as out:
+        out.write('{')
+        for n, table in enumerate(latest):
+            out.write(',' if n else '')
+            out.write(f'\n    {json.dumps(table)}: ')
+            if not latest[table]:
+                out.write('[]')
+                continue
+            out.write('[')
+            for m, offset in enumerate(latest[table].values()):
+                src.seek(offset)
+                row = json.loads(src.readline())['row']
+                out.write(',' if m else '')
+                out.write('\n        ' + _indent(json.dumps(row, ensure_ascii=False, indent=4), 8))
+            out.write('\n    ]')
+        out.write('\n}')
+    os.replace(tmp_path, output_path)
+    return {table: len(ids) for table, ids in latest.items()}
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python ndjson_output.py <input.ndjson> <output.json>")
+    else:
+        counts = compact(sys.argv[1], sys.argv[2])
+        print(f"✅ Compacted {', '.join(f'{n} {t}' for t, n in counts.items())} into {sys.argv[2]}")
@@ -0,0 +1,185 @@
+from datetime import datetime
+import glob
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+
+try:
+    import zstandard
+except ImportError:  # Optional: fall back to gzip from the standard library
+    zstandard = None
+
+STORE_DIR = "page_store/"
+DEBUG_DIR = "debug_html/"
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+CODE_RE = re.compile(r'debug_page_(WTCTH-\d+)(_web)?\.html$')
+# What the scrapers read off a page (see product_extractor.extract_page)
+CONTENT_FIELDS = ('name', 'images', 'description', 'using', 'ingredient_text', 'ingredient_block')
+
+# Layout:
+#   page_store/objects/ab/<sha256>.html.zst|.html.gz   one compressed copy per distinct page
+#   page_store/index/<product_code>.jsonl              one line per fetch: digest, content, time, source
+
+def _object_path(digest, store_dir, ext):
+    return os.path.join(store_dir, "objects", digest[:2], f"{digest}.html{ext}")
+
+def _index_path(product_code, store_dir):
+    return os.path.join(store_dir, "index", f"{product_code}.jsonl")
+
+def find_object(digest, store_dir=STORE_DIR):
+    """Path of the stored object for digest, whichever codec wrote it, or None."""
+    for ext in ('.zst', '.gz'):
+        path = _object_path(digest, store_dir, ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+def _compress(data):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), '.zst'
+    return gzip.compress(data, compresslevel=GZIP_LEVEL), '.gz'
+
+def page_digest(html):
+    """Digest a page's HTML is stored under."""
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+def content_digest(page_data):
+    """Digest of the fields extracted from a page.
+
+    The rendered DOM differs on every fetch (tracker timestamps, recommendation
+    carousels, scroll classes), so this, not page_digest, tells whether a
+    product actually changed.
+    """
+    fields = {key: page_data.get(key) for key in CONTENT_FIELDS}
+    return hashlib.sha256(json.dumps(fields, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _latest_from(product_code, source, store_dir):
+    return next((entry for entry in reversed(history(product_code, store_dir)) if entry['source'] == source), None)
+
+def save_page(product_code, html, source="product", store_dir=STORE_DIR, fetched_at=None, content=None):
+    """Store a fetched page and record the fetch in the product's index. Returns the stored object's digest.
+
+    Identical snapshots share one object; every call still appends an index
+    line, so the index keeps the full fetch history. With content (a
+    content_digest of the page), a fetch whose extracted fields match the
+    product's latest snapshot from the same source reuses that snapshot's
+    object instead of storing HTML that differs only in noise.
+    """
+    data = html.encode('utf-8')
+    size = len(data)
+    previous = _latest_from(product_code, source, store_dir) if content else None
+    if previous and previous.get('content') == content and find_object(previous['digest'], store_dir):
+        digest, size = previous['digest'], previous['size']
+    else:
+        digest = page_digest(html)
+    path = find_object(digest, store_dir)
+    stored_bytes = os.path.getsize(path) if path else 0
+    if path is None:
+        compressed, ext = _compress(data)
+        path = _object_path(digest, store_dir, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)  # Atomic, so readers never see a half-written object
+        stored_bytes = len(compressed)
+
+    entry = {
+        'digest': digest,
+        'fetched_at': fetched_at or datetime.now().isoformat(timespec='seconds'),
+        'source': source,
+        'size': size,
+        'stored': stored_bytes,
+    }
+    if content:
+        entry['content'] = content
+    index_path = _index_path(product_code, store_dir)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    with open(index_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
+    return digest
+
+def open_page(digest, store_dir=STORE_DIR):
+    """Open a stored page as a text stream, decompressing as it is read."""
+    path = find_object(digest, store_dir)
+    if path is None:
+        raise FileNotFoundError(f"No stored page with digest {digest}")
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if zstandard is None:
+        raise RuntimeError(f"{path} is zstd-compressed; install 'zstandard' to read it")
+    raw = open(path, 'rb')
+    return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), encoding='utf-8')
+
+def load_page(digest, store_dir=STORE_DIR):
+    """Read a whole stored page."""
+    with open_page(digest, store_dir) as f:
+        return f.read()
+
+def history(product_code, store_dir=STORE_DIR):
+    """All recorded fetches of a product, oldest first."""
+    path = _index_path(product_code, store_dir)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def latest(product_code, store_dir=STORE_DIR):
+    """The most recent fetch record of a product, or None."""
+    entries = history(product_code, store_dir)
+    return entries[-1] if entries else None
+
+def iter_latest(store_dir=STORE_DIR):
+    """Yield (product_code, latest fetch record) for every product in the store."""
+    for path in sorted(glob.glob(os.path.join(store_dir, "index", "*.jsonl"))):
+        product_code = os.path.basename(path)[:-len(".jsonl")]
+        entry = latest(product_code, store_dir)
+        if entry:
+            yield product_code, entry
+
+def import_debug_pages(debug_dir=DEBUG_DIR, store_dir=STORE_DIR):
+    """Move the legacy debug_page_*.html archive into the store, oldest snapshot first."""
+    paths = sorted(glob.glob(os.path.join(debug_dir, "debug_page_*.html")),
+                   key=lambda p: (bool(CODE_RE.search(p) and CODE_RE.search(p).group(2)), p))
+    raw_bytes = 0
+    for path in paths:
+        match = CODE_RE.search(os.path.basename(path))
+        if not match:
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        raw_bytes += len(html.encode('utf-8'))
+        fetched_at = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='seconds')
+        save_page(match.group(1), html, source="web" if match.group(2) else "product",
+                  store_dir=store_dir, fetched_at=fetched_at)
+    print(f"✅ Imported {len(paths)} pages ({raw_bytes / 1024 / 1024:.1f} MB) into {store_dir}")
+    print_stats(store_dir)
+
+def print_stats(store_dir=STORE_DIR):
+    """Print how much space the store uses compared to the raw pages."""
+    objects = glob.glob(os.path.join(store_dir, "objects", "*", "*.html.*"))
+    stored = sum(os.path.getsize(p) for p in objects)
+    fetches = 0
+    raw = {}
+    for path in glob.glob(os.path.join(store_dir, "index", "*.jsonl")):
+        for entry in history(os.path.basename(path)[:-len(".jsonl")], store_dir):
+            fetches += 1
+            raw[entry['digest']] = entry['size']
+    raw_total = sum(raw.values())
+    ratio = raw_total / stored if stored else 0
+    print(f"📦 {len(objects)} distinct pages from {fetches} fetches: "
+          f"{raw_total / 1024 / 1024:.1f} MB raw -> {stored / 1024 / 1024:.1f} MB stored ({ratio:.1f}x)")
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "import":
+        import_debug_pages(sys.argv[2] if len(sys.argv) > 2 else DEBUG_DIR)
+    elif command == "stats":
+        print_stats()
+    else:
+        print("Usage: python page_store.py [import [debug_dir] | stats]")
@@ -0,0 +1,179 @@
+from lxml import etree
+import re
+
+# Classes the product gallery <e2-media> elements carry (any one of them is enough)
+MEDIA_CLASSES = {f'ng-tns-c2042697079-{i}' for i in range(10)} | {'ng-star-inserted', 'is-initialized'}
+SKIPPED_MEDIA_FORMATS = ('thumbnail', 'product')
+DESCRIPTION_TAGS = {'div', 'x-p', 'span'}
+DESCRIPTION_RE = re.compile(r'(content ng-tns-c\d+-\d+|ng-tns-c\d+-\d+ ng-star-inserted|description|product-details)')
+INGREDIENT_HEADER_TAGS = {'h4', 'h3', 'div', 'span'}
+INGREDIENT_BLOCK_RE = re.compile(r'ng-tns-c\d+-\d+ ng-star-inserted|description|product-details')
+INGREDIENT_KEYWORD_RE = re.compile(r'ส่วนประกอบ|ส่วนผสม')
+SECTION_RE = re.compile(r'(วิธีการใช้งาน|ส่วนประกอบ|ส่วนผสม)', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+UPPERCASE_BLOCK_RE = re.compile(r'^[A-Z0-9\s\(\)\-\.\/,]*$')
+# get_text() in BeautifulSoup skips the contents of these tags, so we do too
+NON_TEXT_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+
+_PARSER = etree.HTMLParser(remove_blank_text=False, recover=True)
+# The pages are serialized from the live DOM, where Angular happily nests <p> inside <p>.
+# libxml2 would auto-close the outer paragraph and move text out of it, so paragraphs are
+# renamed to an unknown tag (which libxml2 nests as written) before parsing.
+PARAGRAPH_TAG_RE = re.compile(r'<(/?)p(?=[\s>/])', re.IGNORECASE)
+PARAGRAPH_TAG = 'x-p'
+
+def _class_matches(pattern, classes):
+    """Match a class regex the way BeautifulSoup's class_= does: per class, then the whole attribute."""
+    parts = classes.split()
+    for part in parts:
+        if pattern.search(part):
+            return True
+    return len(parts) > 1 and bool(pattern.search(' '.join(parts)))
+
+def _collect_text(el, out):
+    if el.text and el.tag not in NON_TEXT_TAGS:
+        out.append(el.text)
+    for child in el:
+        if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+            _collect_text(child, out)
+        if child.tail:
+            out.append(child.tail)
+
+def element_text(el):
+    """Concatenated text of el, without comments or script/style contents."""
+    if next(el.iter(*NON_TEXT_TAGS), None) is None:
+        return ''.join(el.itertext())
+    out = []
+    _collect_text(el, out)
+    return ''.join(out)
+
+def element_text_stripped(el):
+    """Equivalent of BeautifulSoup's get_text(strip=True)."""
+    if next(el.iter(*NON_TEXT_TAGS), None) is None:
+        pieces = el.itertext()
+    else:
+        pieces = []
+        _collect_text(el, pieces)
+    return ''.join(piece.strip() for piece in pieces)
+
+def _single_string(el):
+    """Equivalent of BeautifulSoup's Tag.string: the only string below a chain of only-children."""
+    while True:
+        children = len(el)
+        if children == 0:
+            return el.text
+        if children > 1 or el.text:
+            return None
+        child = el[0]
+        if child.tail:
+            return None
+        if not isinstance(child.tag, str):
+            return child.text  # A lone comment is the string
+        el = child
+
+def split_sections(description):
+    """Split the description text into (description, using, ingredient_text)."""
+    parts = SECTION_RE.split(description)
+    desc_parts = []
+    using = ''
+    ingredient_text = ''
+    i = 0
+    while i < len(parts):
+        part = parts[i].strip()
+        if part.lower() in ['วิธีการใช้งาน']:
+            if i + 1 < len(parts):
+                using = parts[i + 1].strip()
+                i += 2
+                continue
+        elif part.lower() in ['ส่วนประกอบ', 'ส่วนผสม']:
+            if i + 1 < len(parts):
+                ingredient_text = parts[i + 1].strip()
+                i += 2
+                continue
+        else:
+            desc_parts.append(part)
+            i += 1
+    return ' '.join(desc_parts).strip(), using, ingredient_text
+
+def extract_page(html, product_code):
+    """Collect everything the scrapers need from a product page in one tree walk.
+
+    Returns a dict with:
+      name, images          - gallery image srcs for product_code and the first alt text
+      description, using,
+      ingredient_text       - the description blocks split on their Thai section headers
+      ingredient_block      - the text block following the ส่วนประกอบ/ส่วนผสม header
+      ingredient_context    - HTML around the first keyword, for failure reports
+    """
+    root = etree.fromstring(PARAGRAPH_TAG_RE.sub(r'<\1' + PARAGRAPH_TAG, html), _PARSER)
+    images = {}
+    name = ''
+    description_chunks = []
+    header_seen = False
+    ingredient_block = ''
+    keyword_parents = []
+
+    if root is None:
+        return {'name': '', 'images': [], 'description': '', 'using': '', 'ingredient_text': '',
+                'ingredient_block': '', 'ingredient_context': ''}
+
+    for el in root.iter():
+        # Remember where the keyword shows up as text, for the sibling fallback below
+        if el.tail and INGREDIENT_KEYWORD_RE.search(el.tail):
+            keyword_parents.append(el.getparent())
+        tag = el.tag
+        if not isinstance(tag, str):
+            continue  # Comments and processing instructions only matter for their tail
+        if el.text and tag not in NON_TEXT_TAGS and INGREDIENT_KEYWORD_RE.search(el.text):
+            keyword_parents.append(el)
+        classes = el.get('class') or ''
+
+        if tag == 'e2-media':
+            if (MEDIA_CLASSES.intersection(classes.split())
+                    and el.get('format') not in SKIPPED_MEDIA_FORMATS and not el.get('redzoomclass')):
+                img = next(el.iter('img'), None)
+                if img is not None:
+                    src = img.get('src', '') or img.get('data-src', '')
+                    if product_code in src:
+                        images[src] = True
+                        if not name:
+                            name = img.get('alt', '')
+
+        if tag in DESCRIPTION_TAGS and classes:
+            if _class_matches(DESCRIPTION_RE, classes):
+                description_chunks.append(element_text(el).strip())
+            if header_seen and not ingredient_block and _class_matches(INGREDIENT_BLOCK_RE, classes):
+                ingredient_block = element_text_stripped(el)
+
+        if not header_seen and tag in INGREDIENT_HEADER_TAGS:
+            string = _single_string(el)
+            if string and INGREDIENT_KEYWORD_RE.search(string):
+                header_seen = True
+
+    # Fallback: the block is the sibling right after the element holding the keyword
+    context = ''
+    if keyword_parents:
+        context = etree.tostring(keyword_parents[0], encoding='unicode', with_tail=False)
+        context = context.replace('<' + PARAGRAPH_TAG, '<p').replace('</' + PARAGRAPH_TAG, '</p')[:500]
+    if not ingredient_block:
+        for parent in keyword_parents:
+            sibling = next((s for s in parent.itersiblings() if s.tag in DESCRIPTION_TAGS), None)
+            if sibling is not None:
+                ingredient_block = element_text_stripped(sibling)
+                break
+            text = element_text_stripped(parent)
+            if text and UPPERCASE_BLOCK_RE.match(text):
+                ingredient_block = text
+                break
+
+    description = WHITESPACE_RE.sub(' ', '\n'.join(description_chunks)).strip()
+    full_description, using, ingredient_text = split_sections(description)
+    return {
+        'name': name,
+        'images': list(images),
+        'description': full_description,
+        'using': using,
+        'ingredient_text': ingredient_text,
+        'ingredient_block': ingredient_block,
+        'ingredient_context': context,
+    }
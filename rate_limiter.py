@@ -0,0 +1,112 @@
+from urllib.parse import urlparse
+import asyncio
+import threading
+import time
+
+ADAPTIVE_RATE = True  # Pace every navigation through a per-host limiter that follows the site's health
+INITIAL_RATE = 1.0  # Navigations per second per host to start from
+MIN_RATE = 0.1
+MAX_RATE = 8.0
+BURST = 2  # Navigations allowed back to back before the rate applies
+INCREASE = 0.1  # Added to the rate after each healthy response (additive increase)
+DECREASE = 0.5  # Rate multiplier on throttling, errors or slow responses (multiplicative decrease)
+DECREASE_INTERVAL = 5.0  # Seconds after a decrease during which further bad responses don't cut again
+LATENCY_TARGET = 4.0  # Seconds; responses slower than this (smoothed) count as the site struggling
+LATENCY_SMOOTHING = 0.2  # Weight of the newest sample in the moving average
+THROTTLE_STATUSES = {403, 429, 500, 502, 503, 504}  # 403 is what the site's bot wall answers with
+BLOCKED_URL_MARKS = ('captcha', 'blocked', 'challenge')
+
+class AdaptiveRateLimiter:
+    """Token bucket whose refill rate follows the site's health, AIMD style.
+
+    Every healthy, fast response raises the rate a little; a throttled or
+    failed response, or a smoothed latency above LATENCY_TARGET, halves it
+    (at most once per DECREASE_INTERVAL, so one burst of failures from
+    concurrent pages counts once). Safe to share between the HTTP fetch threads.
+    """
+
+    def __init__(self, rate=INITIAL_RATE, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.latency = None
+        self.last_decrease = 0.0
+        self.stats = {'requests': 0, 'throttled': 0, 'decreases': 0, 'waited': 0.0, 'peak_rate': rate}
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token, going into debt if none is left; returns how long to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.stats['requests'] += 1
+            self.stats['waited'] += wait
+            return wait
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def record(self, seconds, throttled=False):
+        """Feed back one navigation: how long it took and whether the site pushed back."""
+        with self.lock:
+            self._record(seconds, throttled)
+
+    def _record(self, seconds, throttled):
+        self.latency = seconds if self.latency is None else \
+            LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * self.latency
+        if throttled:
+            self.stats['throttled'] += 1
+        if throttled or self.latency > LATENCY_TARGET:
+            now = time.monotonic()
+            if now - self.last_decrease >= DECREASE_INTERVAL and self.rate > MIN_RATE:
+                self.last_decrease = now
+                self.rate = max(MIN_RATE, self.rate * DECREASE)
+                self.stats['decreases'] += 1
+                print(f"🐢 Slowing down to {self.rate:.2f} pages/s "
+                      f"({'throttled' if throttled else f'latency {self.latency:.1f}s'})")
+        else:
+            self.rate = min(MAX_RATE, self.rate + INCREASE)
+            self.stats['peak_rate'] = max(self.stats['peak_rate'], self.rate)
+
+LIMITERS = {}  # host (plus backend, if not the browser) -> AdaptiveRateLimiter
+
+def host_key(url, backend=None):
+    """Key of a URL's host, kept apart per backend so the HTTP fetches don't pace or trip the browser."""
+    host = urlparse(url).netloc
+    return f"{host} [{backend}]" if backend else host
+
+def limiter_for(url, backend=None):
+    key = host_key(url, backend)
+    if key not in LIMITERS:
+        LIMITERS.setdefault(key, AdaptiveRateLimiter())  # setdefault: two fetch threads may get here at once
+    return LIMITERS[key]
+
+def is_throttled(response):
+    """Whether a navigation response means the site is refusing or struggling."""
+    if response is None:
+        return False
+    return is_throttled_status(response.status, response.url)
+
+def is_throttled_status(status, url):
+    """is_throttled for a bare status and final URL, e.g. from a requests response."""
+    return status in THROTTLE_STATUSES or any(mark in url.lower() for mark in BLOCKED_URL_MARKS)
+
+def print_rate_summary():
+    for host, limiter in LIMITERS.items():
+        stats = limiter.stats
+        if not stats['requests']:
+            continue
+        print(f"🚦 {host}: {stats['requests']} navigations, rate now {limiter.rate:.2f}/s "
+              f"(peak {stats['peak_rate']:.2f}/s), {stats['throttled']} throttled, "
+              f"{stats['decreases']} slow-downs, {stats['waited']:.0f}s spent waiting")
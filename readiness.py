@@ -0,0 +1,75 @@
+import time
+
+SIGNAL_TIMEOUT = 8000  # ms to wait for the product signals before falling back
+NETWORK_IDLE_CAP = 3000  # ms cap on the network-quiet fallback
+POLL_INTERVAL = 100  # ms between signal checks
+
+# Ready once the product images are attached and the ingredient section is rendered.
+# The section is optional for pages that simply have no ingredient list, which is why
+# the waits below fall back to network quiescence instead of failing.
+READY_SCRIPT = """
+([code, needImages]) => {
+    const imagesReady = !needImages || !!document.querySelector(`e2-media img[src*="${code}"]`);
+    if (!imagesReady) return false;
+    const headers = document.querySelectorAll('h3, h4');
+    for (const h of headers) {
+        if (/ส่วนประกอบ|ส่วนผสม/.test(h.textContent)) return true;
+    }
+    return false;
+}
+"""
+
+READY_LOG = []  # (url, seconds, reason) for every page waited on in this run
+
+def _record(url, start, reason):
+    seconds = time.perf_counter() - start
+    READY_LOG.append((url, seconds, reason))
+    print(f"⏱️ Ready in {seconds:.2f}s ({reason})")
+    return {'ready': reason == 'signals', 'reason': reason, 'seconds': seconds}
+
+def wait_for_product_ready(page, product_code, need_images=True):
+    """Wait for the product signals on a sync page; fall back to a capped network-idle wait."""
+    start = time.perf_counter()
+    page.wait_for_load_state('domcontentloaded', timeout=15000)
+    # Scroll so lazily rendered sections (description tabs, ingredients) get attached
+    page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+    try:
+        page.wait_for_function(READY_SCRIPT, arg=[product_code, need_images],
+                               timeout=SIGNAL_TIMEOUT, polling=POLL_INTERVAL)
+        return _record(page.url, start, 'signals')
+    except Exception:
+        pass
+    try:
+        page.wait_for_load_state('networkidle', timeout=NETWORK_IDLE_CAP)
+        return _record(page.url, start, 'network-idle')
+    except Exception:
+        return _record(page.url, start, 'timeout')
+
+async def wait_for_product_ready_async(page, product_code, need_images=True):
+    """Async twin of wait_for_product_ready for the crawl engine's page pool."""
+    start = time.perf_counter()
+    await page.wait_for_load_state('domcontentloaded', timeout=15000)
+    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+    try:
+        await page.wait_for_function(READY_SCRIPT, arg=[product_code, need_images],
+                                     timeout=SIGNAL_TIMEOUT, polling=POLL_INTERVAL)
+        return _record(page.url, start, 'signals')
+    except Exception:
+        pass
+    try:
+        await page.wait_for_load_state('networkidle', timeout=NETWORK_IDLE_CAP)
+        return _record(page.url, start, 'network-idle')
+    except Exception:
+        return _record(page.url, start, 'timeout')
+
+def print_ready_summary():
+    """Print how long pages took to become ready during this run."""
+    if not READY_LOG:
+        return
+    times = sorted(seconds for _, seconds, _ in READY_LOG)
+    reasons = {}
+    for _, _, reason in READY_LOG:
+        reasons[reason] = reasons.get(reason, 0) + 1
+    median = times[len(times) // 2]
+    print(f"⏱️ Time-to-ready over {len(times)} pages: median {median:.2f}s, "
+          f"max {times[-1]:.2f}s, total {sum(times):.1f}s {reasons}")
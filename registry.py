@@ -0,0 +1,91 @@
+class DatasetRegistry:
+    """Hash indexes over a product dataset dict ({'ingredient': [...], 'product': [...], ...}).
+
+    Looking up or interning an ingredient by name and adding or replacing a
+    product by id are O(1), however large the dataset grows. The registry
+    mutates `data` in place, so whatever saves `data` sees every change; it
+    must be the only thing adding ingredients or products while it is in use.
+
+    With a canon (ingredient_canon.CanonIndex), names are first mapped to
+    their canonical spelling, so a misspelt variant reuses the existing id.
+
+    With a sink (ndjson_output.NdjsonWriter), every new ingredient and stored
+    product is also written to it as it happens; keep_products=False then
+    leaves products only in the sink, so memory does not grow with the catalog.
+    """
+
+    def __init__(self, data, canon=None, sink=None, keep_products=True):
+        self.data = data
+        self.canon = canon
+        self.sink = sink
+        self.keep_products = keep_products
+        data.setdefault('ingredient', [])
+        data.setdefault('product', [])
+        self._ingredient_by_name = {}  # normalized name -> ingredient dict
+        self._ingredient_by_id = {}
+        self._product_index = {}  # product id -> position in data['product']
+        for ing in data['ingredient']:
+            self._ingredient_by_id[ing['id']] = ing
+            self._ingredient_by_name.setdefault(self.normalize(ing['name']), ing)
+        for index, prod in enumerate(data['product']):
+            self._product_index[prod['id']] = index
+        # Monotonic counters: ids are never reused, even if entries are removed from data later
+        self.next_ingredient_id = max(self._ingredient_by_id, default=0) + 1
+        self.next_product_id = max(self._product_index, default=0) + 1
+
+    @staticmethod
+    def normalize(name):
+        """Key ingredient names are deduplicated on."""
+        return name.lower()
+
+    def find_ingredient(self, name):
+        """Id of the ingredient called name (case-insensitively), or None."""
+        ing = self._ingredient_by_name.get(self.normalize(name))
+        return ing['id'] if ing else None
+
+    def ingredient_id(self, name):
+        """Id of the ingredient called name, adding it to the dataset if it is new."""
+        if self.canon is not None:
+            name = self.canon.resolve(name)
+        key = self.normalize(name)
+        ing = self._ingredient_by_name.get(key)
+        if ing is None:
+            ing = {'id': self.next_ingredient_id, 'name': name, 'allergic': False, 'allergic-relation': None}
+            self.next_ingredient_id += 1
+            self.data['ingredient'].append(ing)
+            self._ingredient_by_id[ing['id']] = ing
+            self._ingredient_by_name[key] = ing
+            if self.sink is not None:
+                self.sink.write('ingredient', ing)
+        return ing['id']
+
+    def ingredient_ids(self, names):
+        """ingredient_id for each name, in order."""
+        return [self.ingredient_id(name) for name in names]
+
+    def ingredient(self, ingredient_id):
+        """The ingredient dict with this id, or None."""
+        return self._ingredient_by_id.get(ingredient_id)
+
+    def product(self, product_id):
+        """The product dict with this id, or None."""
+        index = self._product_index.get(product_id)
+        return self.data['product'][index] if index is not None else None
+
+    def put_product(self, fields, product_id=None):
+        """Store a product built from fields, under a new id or replacing product_id. Returns it."""
+        if product_id is None:
+            product_id = self.next_product_id
+        self.next_product_id = max(self.next_product_id, product_id + 1)
+        product = {'id': product_id, **fields}
+        if self.sink is not None:
+            self.sink.write('product', product)
+        if not self.keep_products:
+            return product
+        index = self._product_index.get(product_id)
+        if index is None:
+            self._product_index[product_id] = len(self.data['product'])
+            self.data['product'].append(product)
+        else:
+            self.data['product'][index] = product
+        return product
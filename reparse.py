@@ -0,0 +1,141 @@
+from concurrent.futures import ProcessPoolExecutor
+from product_extractor import extract_page
+from page_store import STORE_DIR, iter_latest, open_page
+from ingredient_tokenizer import parse_ingredient_text
+from registry import DatasetRegistry
+from dataset import product_code_of
+from ingredient_canon import canonicalize_dataset
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+INPUT_JSON = "updated_product_data.json"  # Provides product ids, links, categories and users
+OUTPUT_JSON = "reparsed_product_data.json"
+DEBUG_DIR = "debug_html/"
+CODE_RE = re.compile(r'debug_page_(WTCTH-\d+)(_web)?\.html$')
+
+def find_archived_pages(debug_dir=DEBUG_DIR):
+    """Map product code -> archived page, preferring the newer _web re-scrape when both exist."""
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(debug_dir, "debug_page_*.html"))):
+        match = CODE_RE.search(os.path.basename(path))
+        if not match:
+            continue
+        code, is_web = match.group(1), bool(match.group(2))
+        if is_web or code not in pages:
+            pages[code] = path
+    return pages
+
+def find_stored_pages(store_dir=STORE_DIR):
+    """Map product code -> digest of its latest snapshot in the page store."""
+    return {code: entry['digest'] for code, entry in iter_latest(store_dir)}
+
+def reparse_page(job):
+    """Worker: run the extraction and ingredient parsing over one archived page."""
+    code, location, store_dir = job
+    if store_dir:
+        with open_page(location, store_dir) as f:
+            html = f.read()
+    else:
+        with open(location, 'r', encoding='utf-8') as f:
+            html = f.read()
+    page_data = extract_page(html, code)
+    block = page_data['ingredient_block']
+    return {
+        'code': code,
+        'name': page_data['name'],
+        'images': page_data['images'],
+        'description': page_data['description'],
+        'using': page_data['using'],
+        'ingredients': parse_ingredient_text(block) if block else [],
+    }
+
+def build_dataset(base, parsed):
+    """Rebuild the ingredient table and product ingredient lists from freshly parsed pages."""
+    old_ingredients = {ing['id']: ing for ing in base['ingredient']}
+    registry = DatasetRegistry({'ingredient': [], 'product': []})
+    ingredient_id = registry.ingredient_id
+    products = []
+    missing = []
+
+    for product in base['product']:
+        code = product_code_of(product)
+        page = parsed.get(code)
+        if not page:
+            # No archived page: keep the product, remapping its old ingredient ids by name
+            missing.append(code or product.get('link'))
+            products.append(dict(product, ingredient=[ingredient_id(old_ingredients[i]['name'])
+                                                      for i in product['ingredient'] if i in old_ingredients]))
+            continue
+        names = page['ingredients'] or ["UNKNOWN"]
+        products.append(dict(
+            product,
+            name=page['name'] or product['name'],
+            description=page['description'],
+            using=page['using'],
+            image=page['images'] or product.get('image', []),
+            ingredient=[ingredient_id(name) for name in names],
+        ))
+
+    # Carry allergy flags over by ingredient name
+    new_id_of = {old_id: registry.find_ingredient(ing['name']) for old_id, ing in old_ingredients.items()}
+    for old_id, old in old_ingredients.items():
+        new_id = new_id_of[old_id]
+        if new_id is None or not (old['allergic'] or old['allergic-relation']):
+            continue
+        ing = registry.ingredient(new_id)
+        ing['allergic'] = old['allergic']
+        if old['allergic-relation']:
+            ing['allergic-relation'] = [new_id_of[i] for i in old['allergic-relation'] if new_id_of.get(i)]
+
+    users = []
+    for user in base['user']:
+        users.append(dict(user, allergic=[new_id_of[i] for i in user['allergic'] if new_id_of.get(i)]))
+
+    dataset = {'user': users, 'ingredient': registry.data['ingredient'], 'category': base['category'], 'product': products}
+    return dataset, missing
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extract the product dataset from archived pages, offline.")
+    parser.add_argument('--input', default=INPUT_JSON, help="dataset providing product ids, links and categories")
+    parser.add_argument('--output', default=OUTPUT_JSON)
+    parser.add_argument('--debug-dir', default=DEBUG_DIR)
+    parser.add_argument('--store', nargs='?', const=STORE_DIR, default=None,
+                        help="read the latest snapshots from the page store instead of debug_html/")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--canonicalize', action='store_true',
+                        help="fold misspelt and differently punctuated ingredient names together")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    pages = find_stored_pages(args.store) if args.store else find_archived_pages(args.debug_dir)
+    wanted = {product_code_of(p) for p in base['product']}
+    jobs = [(code, location, args.store) for code, location in pages.items() if code in wanted]
+    print(f"📂 Re-parsing {len(jobs)} archived pages with {args.workers} workers...")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        parsed = {page['code']: page for page in pool.map(reparse_page, jobs, chunksize=4)}
+    parse_seconds = time.perf_counter() - start
+
+    dataset, missing = build_dataset(base, parsed)
+    if args.canonicalize:
+        before = len(dataset['ingredient'])
+        dataset, merges, dropped = canonicalize_dataset(dataset)
+        print(f"🔗 Canonicalized {before} -> {len(dataset['ingredient'])} ingredients "
+              f"({len(merges)} fuzzy merges, {len(dropped)} fragments dropped)")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(dataset, f, ensure_ascii=False, indent=4)
+
+    for code in missing:
+        print(f"⚠️ No archived page for {code}, kept its previous data")
+    print(f"✅ Parsed {len(parsed)} pages in {parse_seconds:.2f}s, "
+          f"{len(dataset['ingredient'])} unique ingredients")
+    print(f"✅ Saved data to {args.output}")
+
+if __name__ == "__main__":
+    main()
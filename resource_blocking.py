@@ -0,0 +1,90 @@
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlparse
+
+BLOCK_RESOURCES = True  # Product scrapers only need the DOM and image src strings
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font'}
+ALLOWED_DOMAINS = ['watsons.co.th']  # Anything else (tag managers, chat widgets, trackers) is aborted
+
+def new_blocking_stats():
+    """Counters shared by the route handler and response listener of one run."""
+    return {
+        'allowed': 0,
+        'blocked': 0,
+        'blocked_by_type': {},
+        'blocked_by_host': {},
+        'bytes_received': 0,
+    }
+
+def is_allowed_host(host, allowed_domains=ALLOWED_DOMAINS):
+    """True if host is one of the allowed domains or a subdomain of one."""
+    return any(host == domain or host.endswith('.' + domain) for domain in allowed_domains)
+
+def make_route_handler(stats, blocked_types=BLOCKED_RESOURCE_TYPES, allowed_domains=ALLOWED_DOMAINS):
+    """Build a route handler that aborts heavy or off-site requests.
+
+    The handler returns whatever route.abort()/route.continue_() return, so the
+    same function works with the sync API and, as an awaited coroutine, with
+    the async API.
+    """
+    def handle(route):
+        request = route.request
+        resource_type = request.resource_type
+        host = urlparse(request.url).hostname or ''
+        if resource_type in blocked_types or not is_allowed_host(host, allowed_domains):
+            stats['blocked'] += 1
+            stats['blocked_by_type'][resource_type] = stats['blocked_by_type'].get(resource_type, 0) + 1
+            stats['blocked_by_host'][host] = stats['blocked_by_host'].get(host, 0) + 1
+            return route.abort()
+        stats['allowed'] += 1
+        return route.continue_()
+    return handle
+
+def response_size(response):
+    """Bytes of a response as its Content-Length declares them (0 if it doesn't, e.g. when chunked)."""
+    length = response.headers.get('content-length')
+    return int(length) if length and length.isdigit() else 0
+
+def make_response_listener(stats):
+    """Count the bytes of every response that was let through."""
+    def on_response(response):
+        stats['bytes_received'] += response_size(response)
+    return on_response
+
+@contextmanager
+def _count_transfer(page, trace):
+    def on_response(response):
+        trace.bytes_received += response_size(response)
+    page.on("response", on_response)
+    try:
+        yield
+    finally:
+        page.remove_listener("response", on_response)
+
+def count_transfer(page, trace):
+    """Add the size of every response the page receives meanwhile to trace.bytes_received (sync or async API)."""
+    return _count_transfer(page, trace) if trace is not None else nullcontext()
+
+def block_resources(context, stats=None):
+    """Enable request interception on a sync-API browser context."""
+    stats = stats if stats is not None else new_blocking_stats()
+    context.route("**/*", make_route_handler(stats))
+    context.on("response", make_response_listener(stats))
+    return stats
+
+async def block_resources_async(context, stats=None):
+    """Enable request interception on an async-API browser context."""
+    stats = stats if stats is not None else new_blocking_stats()
+    await context.route("**/*", make_route_handler(stats))
+    context.on("response", make_response_listener(stats))
+    return stats
+
+def print_blocking_summary(stats):
+    """Print how many requests were blocked and how much was actually downloaded."""
+    total = stats['allowed'] + stats['blocked']
+    if not total:
+        return
+    top_hosts = sorted(stats['blocked_by_host'].items(), key=lambda item: item[1], reverse=True)[:5]
+    print(f"🚫 Blocked {stats['blocked']}/{total} requests "
+          f"({stats['blocked'] * 100 // total}%), by type: {stats['blocked_by_type']}")
+    print(f"🚫 Top blocked hosts: {top_hosts}")
+    print(f"📦 Downloaded {stats['bytes_received'] / 1024 / 1024:.1f} MB across {stats['allowed']} allowed requests")
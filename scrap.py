@@ -1,9 +1,11 @@
 from playwright.sync_api import sync_playwright
 from bs4 import BeautifulSoup
+from registry import DatasetRegistry
+from browser_pool import open_context
+from navigation import goto
 import json
 import re
 import time
-import os
 
 SESSION_FILE = "watsons_session.json"
 URL = "https://www.watsons.co.th/th/spectraban-%E0%B8%AA%E0%B9%80%E0%B8%9B%E0%B8%84%E0%B8%95%E0%B8%A3%E0%B9%89%E0%B8%B2%E0%B9%81%E0%B8%9A%E0%B8%99-%E0%B9%80%E0%B8%AD%E0%B8%AA%E0%B8%9E%E0%B8%B5%E0%B9%80%E0%B8%AD%E0%B8%9F-50-100-%E0%B8%81%E0%B8%A3%E0%B8%B1%E0%B8%A1/p/BP_139729"
@@ -16,10 +18,10 @@ def save_to_json(obj):
         json.dump(obj, f, ensure_ascii=False, indent=4)
     print(f"✅ Saved data to {OUTPUT_JSON}")
 
-def extract_product_details(page, url, obj):
-    """Extract details from a product page and add to obj."""
+def extract_product_details(page, url, registry):
+    """Extract details from a product page and add it to the registry's dataset."""
     print(f"📄 Navigating to: {url}")
-    page.goto(url)
+    goto(page, url)
     print("⏳ Waiting for page content to load...")
     page.wait_for_load_state('domcontentloaded', timeout=15000)
     time.sleep(2)  # Brief delay for JavaScript rendering
@@ -93,25 +95,10 @@ def extract_product_details(page, url, obj):
                 ingredients.append(ing)
 
     # Map ingredients
-    ingredient_map = {ing['name'].lower(): ing['id'] for ing in obj['ingredient']}
-    next_ing_id = max(ing['id'] for ing in obj['ingredient']) + 1 if obj['ingredient'] else 1
-    ingredient_ids = []
-
-    for ing in ingredients:
-        ing_lower = ing.lower()
-        if ing_lower in ingredient_map:
-            ingredient_ids.append(ingredient_map[ing_lower])
-        else:
-            new_ing = {'id': next_ing_id, 'name': ing, 'allergic': False, 'allergic-relation': None}
-            obj['ingredient'].append(new_ing)
-            ingredient_map[ing_lower] = next_ing_id
-            ingredient_ids.append(next_ing_id)
-            next_ing_id += 1
+    ingredient_ids = registry.ingredient_ids(ingredients)
 
     # Add new product (no price)
-    next_prod_id = max(prod['id'] for prod in obj['product']) + 1 if obj['product'] else 1
-    new_product = {
-        'id': next_prod_id,
+    new_product = registry.put_product({
         'name': name,
         'description': full_description,
         'using': using,
@@ -119,45 +106,13 @@ def extract_product_details(page, url, obj):
         'ingredient': ingredient_ids,
         'category': 1,  # Hardcoded to sunscreen category
         'link': url
-    }
-
-    obj['product'].append(new_product)
+    })
     print(f"✅ Added product: {name}")
 
 with sync_playwright() as p:
     try:
-        print("🌐 Opening Microsoft Edge...")
-        browser = p.chromium.launch(
-            channel="msedge",
-            headless=False,  # Set to True for background running
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor'
-            ]
-        )
-
-        # Load or create session
-        if os.path.exists(SESSION_FILE):
-            print("🔐 Loading saved session...")
-            context = browser.new_context(storage_state=SESSION_FILE)
-        else:
-            print("🔑 No session found. Creating new session with manual login...")
-            context = browser.new_context()
-            page = context.new_page()
-            page.goto("https://www.watsons.co.th/th/login")
-            print("⏳ Please log in manually in the browser window...")
-            print("👉 After successful login, press Enter here to continue and save the session...")
-            input()  # Wait for user input after manual login
-            try:
-                # Verify we're on the main site after login
-                page.wait_for_url("**/watsons.co.th/**", timeout=10000)
-                context.storage_state(path=SESSION_FILE)
-                print(f"✅ Session saved to {SESSION_FILE}")
-            except Exception as e:
-                print(f"❌ Login verification failed: {e}. Please try again.")
-                browser.close()
-                exit()
+        # Open browser with saved session
+        browser, context = open_context(p, SESSION_FILE)
 
         # Set up new page and headers
         page = context.new_page()
@@ -186,7 +141,7 @@ with sync_playwright() as p:
         }
 
         # Scrape the single product page
-        extract_product_details(page, URL, obj)
+        extract_product_details(page, URL, DatasetRegistry(obj))
 
         # Save to JSON
         save_to_json(obj)
@@ -1,13 +1,19 @@
 from playwright.sync_api import sync_playwright
+from resource_blocking import BLOCK_RESOURCES, block_resources, count_transfer, new_blocking_stats, print_blocking_summary
 from bs4 import BeautifulSoup
+from registry import DatasetRegistry
+from browser_pool import PageRecycler, open_context, print_recycler_summary
+from navigation import TransientNavigationError, goto, run_with_requeue, print_navigation_summary
+from ndjson_output import STREAM_OUTPUT, NdjsonWriter, compact
+from telemetry import Trace, print_telemetry_summary
 import json
 import re
 import time
-import os
 import csv
 
 SESSION_FILE = "watsons_session.json"
 OUTPUT_JSON = "product_data_recursive.json"
+OUTPUT_NDJSON = "product_data_recursive.ndjson"  # One row per line, written as products are scraped
 
 def save_to_json(obj):
     """Save the object to JSON file."""
@@ -31,15 +37,21 @@ def map_category(type_name):
     }
     return category_map.get(type_name, 1)  # Default to Sunscreen if unknown
 
-def extract_product_details(page, url, product_code, category_id, obj):
-    """Extract details from a product page and add to obj."""
+def extract_product_details(page, url, product_code, category_id, registry):
+    """Extract details from a product page and add it to the registry's dataset."""
     print(f"📄 Navigating to: {url}")
+    trace = Trace(url)
     try:
-        page.goto(url, timeout=30000)
-        print("⏳ Waiting for page content to load...")
-        page.wait_for_load_state('domcontentloaded', timeout=15000)
-        time.sleep(2)  # Brief delay for JavaScript rendering
-        html = page.content()
+        with count_transfer(page, trace):
+            with trace.stage('navigate'):
+                goto(page, url, timeout=30000, trace=trace)
+            print("⏳ Waiting for page content to load...")
+            with trace.stage('ready'):
+                page.wait_for_load_state('domcontentloaded', timeout=15000)
+                time.sleep(2)  # Brief delay for JavaScript rendering
+            with trace.stage('serialize'):
+                html = page.content()
+        parse_start = time.perf_counter()
         soup = BeautifulSoup(html, 'html.parser')
 
         # Extract images and name (filter for product code)
@@ -105,39 +117,31 @@ def extract_product_details(page, url, product_code, category_id, obj):
                     ing = re.sub(r' [ป-ฮ].*$', '', ing).strip()
                     ingredients.append(ing)
 
-        # Map ingredients
-        ingredient_map = {ing['name'].lower(): ing['id'] for ing in obj['ingredient']}
-        next_ing_id = max(ing['id'] for ing in obj['ingredient']) + 1 if obj['ingredient'] else 1
-        ingredient_ids = []
+        trace.add('parse', time.perf_counter() - parse_start)
 
-        for ing in ingredients:
-            ing_lower = ing.lower()
-            if ing_lower in ingredient_map:
-                ingredient_ids.append(ingredient_map[ing_lower])
-            else:
-                new_ing = {'id': next_ing_id, 'name': ing, 'allergic': False, 'allergic-relation': None}
-                obj['ingredient'].append(new_ing)
-                ingredient_map[ing_lower] = next_ing_id
-                ingredient_ids.append(next_ing_id)
-                next_ing_id += 1
+        # Map ingredients
+        with trace.stage('ingredients'):
+            ingredient_ids = registry.ingredient_ids(ingredients)
 
         # Add new product
-        next_prod_id = max(prod['id'] for prod in obj['product']) + 1 if obj['product'] else 1
-        new_product = {
-            'id': next_prod_id,
-            'name': name,
-            'description': full_description,
-            'using': using,
-            'image': image_value,
-            'ingredient': ingredient_ids,
-            'category': category_id,
-            'link': url
-        }
-
-        obj['product'].append(new_product)
+        with trace.stage('write'):
+            new_product = registry.put_product({
+                'name': name,
+                'description': full_description,
+                'using': using,
+                'image': image_value,
+                'ingredient': ingredient_ids,
+                'category': category_id,
+                'link': url
+            })
         print(f"✅ Added product: {name}")
+        trace.finish('parsed')
+    except TransientNavigationError:
+        trace.finish('requeued')
+        raise  # Still failing after retries: the caller re-queues it
     except Exception as e:
         print(f"❌ Error scraping {url}: {e}")
+        trace.finish('failed')
 
 def main():
     # Read CSV
@@ -169,48 +173,24 @@ def main():
         ],
         'product': []
     }
+    if STREAM_OUTPUT:
+        # Products go straight to the stream instead of piling up in obj
+        stream = NdjsonWriter(OUTPUT_NDJSON, obj)
+        registry = DatasetRegistry(obj, sink=stream, keep_products=False)
+    else:
+        registry = DatasetRegistry(obj)
+    blocking_stats = new_blocking_stats()
 
     with sync_playwright() as p:
         try:
-            print("🌐 Opening Microsoft Edge...")
-            browser = p.chromium.launch(
-                channel="msedge",
-                headless=False,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-web-security',
-                    '--disable-features=VizDisplayCompositor'
-                ]
-            )
+            browser, context = open_context(p, SESSION_FILE)
 
-            # Load or create session
-            if os.path.exists(SESSION_FILE):
-                print("🔐 Loading saved session...")
-                context = browser.new_context(storage_state=SESSION_FILE)
-            else:
-                print("🔑 No session found. Creating new session with manual login...")
-                context = browser.new_context()
-                page = context.new_page()
-                page.goto("https://www.watsons.co.th/th/login")
-                print("⏳ Please log in manually in the browser window...")
-                print("👉 After successful login, press Enter here to continue and save the session...")
-                input()
-                try:
-                    page.wait_for_url("**/watsons.co.th/**", timeout=10000)
-                    context.storage_state(path=SESSION_FILE)
-                    print(f"✅ Session saved to {SESSION_FILE}")
-                except Exception as e:
-                    print(f"❌ Login verification failed: {e}. Please try again.")
-                    browser.close()
-                    exit()
-
-            # Set up new page
-            page = context.new_page()
-            page.set_extra_http_headers({
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0"
-            })
+            # One page, whose context is replaced when RSS goes over the watchdog's limit
+            pages = PageRecycler(browser, context, SESSION_FILE,
+                                 on_context=lambda c: block_resources(c, blocking_stats) if BLOCK_RESOURCES else None)
 
-            # Process each product
+            # Queue each product
+            jobs = []
             for product in products:
                 url = product['URL']
                 type_name = product['Types']
@@ -226,12 +206,28 @@ def main():
                     continue
 
                 bp_numbers_seen[bp_number] = url
-                category_id = map_category(type_name)
-                extract_product_details(page, url, product_code, category_id, obj)
+                jobs.append((url, product_code, map_category(type_name)))
+
+            # Pages that keep failing go to the back of the queue instead of being dropped
+            failed = run_with_requeue(jobs, lambda job: extract_product_details(pages.page, *job, registry),
+                                      after=pages.page_done)
 
             # Save to JSON
-            save_to_json(obj)
+            if STREAM_OUTPUT:
+                stream.close()
+                compact(OUTPUT_NDJSON, OUTPUT_JSON)
+                print(f"✅ Saved data to {OUTPUT_JSON}")
+            else:
+                save_to_json(obj)
             print("🎉 Processed all product pages!")
+            print_blocking_summary(blocking_stats)
+            print_navigation_summary()
+            print_telemetry_summary()
+            print_recycler_summary(pages)
+            if failed:
+                print(f"⚠️ {len(failed)} product pages could not be loaded:")
+                for url, product_code, _ in failed:
+                    print(f"{product_code}: {url}")
 
             # Log duplicates
             if duplicates:
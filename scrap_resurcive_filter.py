@@ -1,20 +1,38 @@
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from crawl_engine import run_crawl, CONCURRENCY, CONTEXTS, PER_HOST_LIMIT
+from resource_blocking import BLOCK_RESOURCES, block_resources_async, count_transfer, new_blocking_stats, print_blocking_summary
+from fetch_backend import PREFER_HTTP, FETCH_STATS, new_http_session, fetch_many, print_fetch_summary
+from navigation import TransientNavigationError, goto_async, print_navigation_summary
+from readiness import wait_for_product_ready_async, print_ready_summary
+from product_extractor import extract_page
+from page_store import save_page, content_digest
+from crawl_journal import CrawlJournal
+from registry import DatasetRegistry
+from dataset_db import USE_DATABASE, DatasetDB, DatasetMismatch, db_path_for
+from columnar_store import write_columnar
+from ndjson_output import STREAM_OUTPUT, NdjsonWriter, compact
+from ingredient_canon import CANONICALIZE, CanonIndex
+from ingredient_tokenizer import split_ingredients
+from telemetry import Trace, stage, print_telemetry_summary
+from crawl_state import INCREMENTAL, MIN_REFRESH_AGE, load_state, save_state, is_fresh, mark_unchanged, has_changed, record_fetch
+import asyncio
 import json
-import re
-import time
 import os
+import re
 import csv
 from datetime import datetime
 
 SESSION_FILE = "watsons_session.json"
 OUTPUT_JSON = "product_data_recursivefilter.json"
+OUTPUT_COLUMNAR = "product_data_recursivefilter.cols"  # Compact copy for consumers that only need some columns
+OUTPUT_NDJSON = "product_data_recursivefilter.ndjson"  # One row per line, written as products are parsed
 REPORT_FILE = "report.txt"
 
 def save_to_json(obj):
     """Save the object to JSON file."""
-    with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
+    tmp_path = f"{OUTPUT_JSON}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(obj, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, OUTPUT_JSON)  # Atomic, so a crash mid-save keeps the previous checkpoint
     print(f"✅ Saved data to {OUTPUT_JSON}")
 
 def extract_bp_number(url):
@@ -33,69 +51,85 @@ def map_category(type_name):
     }
     return category_map.get(type_name, 1)  # Default to Sunscreen if unknown
 
-def split_ingredients(ingredient_text):
-    """Split ingredient text by commas, preserving commas within parentheses."""
-    ingredients = []
-    current = []
-    paren_count = 0
-    for char in ingredient_text:
-        if char == '(':
-            paren_count += 1
-        elif char == ')':
-            paren_count -= 1
-        elif char == ',' and paren_count == 0:
-            ingredients.append(''.join(current).strip())
-            current = []
-            continue
-        current.append(char)
-    if current:
-        ingredients.append(''.join(current).strip())
-    return [ing for ing in ingredients if ing]
-
-def extract_product_details(page, url, product_code, category_id, obj):
-    """Extract details from a product page and add to obj."""
+async def render_page_async(page, url, product_code, trace=None):
+    """Open a product page on one of the crawl engine's pages and return its rendered HTML, or None on failure."""
     print(f"📄 Navigating to: {url}")
+    FETCH_STATS['browser'] += 1
     try:
-        page.goto(url, timeout=30000)
-        print("⏳ Waiting for page content to load...")
-        page.wait_for_load_state('domcontentloaded', timeout=15000)
-        time.sleep(3)  # Increased delay for JavaScript rendering
-        # Scroll to ensure dynamic content loads
-        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        time.sleep(1)  # Wait after scrolling
-        html = page.content()
-        soup = BeautifulSoup(html, 'html.parser')
-
-        # Save HTML for debugging
-        with open(f"debug_page_{product_code}.html", 'w', encoding='utf-8') as f:
-            f.write(html)
-        print(f"📝 Saved page HTML to debug_page_{product_code}.html")
-
-        # Extract images and name (filter for product code)
-        images = []
-        name = ''
-        for i in range(10):  # Iterate over ng-tns-c2042697079-0 to ng-tns-c2042697079-9
-            class_name = f'ng-tns-c2042697079-{i}'
-            print(f"🔍 Trying class: {class_name} ng-star-inserted is-initialized")
-            for media in soup.find_all('e2-media', class_=[class_name, 'ng-star-inserted', 'is-initialized']):
-                # Skip elements with unwanted attributes
-                if media.get('format') in ['thumbnail', 'product'] or media.get('redzoomclass'):
-                    continue
-                img = media.find('img')
-                if img:
-                    src = img.get('src', '') or img.get('data-src', '')
-                    print(f"Found image src: {src}")  # Debug log
-                    if product_code in src:
-                        images.append(src)
-                        if not name:
-                            name = img.get('alt', '')
-
-        unique_images = list(set(images))
-        num_images = len(unique_images)
-        if num_images >= 3:  # Keep if 3 or more
-            image_value = unique_images
+        with count_transfer(page, trace):
+            with stage(trace, 'navigate'):
+                await goto_async(page, url, timeout=30000, trace=trace)
+            with stage(trace, 'ready'):
+                await wait_for_product_ready_async(page, product_code)
+            with stage(trace, 'serialize'):
+                html = await page.content()
+        return html
+    except TransientNavigationError:
+        raise  # The crawl engine puts the job back at the end of the queue
+    except Exception as e:
+        print(f"❌ Error scraping {url}: {e}")
+        return None
+
+def process_fetched_page(html, job, registry, state, existing, journal, validators=None, trace=None):
+    """(Re)parse a fetched page only if its extracted fields changed, then record it in the crawl state.
+
+    A page that fails to parse leaves its crawl state untouched, so the next
+    run fetches it again. Returns the outcome for telemetry: 'unchanged',
+    'parsed' or 'no-product'.
+    """
+    url = job['url']
+    try:
+        with stage(trace, 'parse'):
+            page_data = extract_page(html, job['product_code'])
+    except Exception as e:
+        print(f"❌ Error parsing {url}: {e}")
+        return 'no-product'
+    digest = content_digest(page_data)
+    old = existing.get(url)
+    if old and not has_changed(state.get(url), digest):
+        print(f"♻️ {job['product_code']} unchanged since the last crawl, keeping product {old['id']}")
+        record_fetch(state, url, digest, validators)
+        with stage(trace, 'write'):
+            journal.record(url, 'unchanged', state=state[url])
+        return 'unchanged'
+    product = parse_product_html(html, url, job['product_code'], job['category_id'], registry,
+                                 product_id=old['id'] if old else None, trace=trace, page_data=page_data)
+    if not product:
+        return 'no-product'
+    record_fetch(state, url, digest, validators)
+    with stage(trace, 'write'):
+        ingredients = [ing for ing in map(registry.ingredient, dict.fromkeys(product['ingredient'])) if ing]
+        journal.record(url, 'parsed', product=product, ingredients=ingredients, state=state[url])
+    return 'parsed'
+
+def parse_product_html(html, url, product_code, category_id, registry, product_id=None, trace=None, page_data=None):
+    """Parse a rendered product page and add the product to the registry's dataset.
+
+    If product_id is given, the product with that id is replaced in place.
+    page_data is extract_page's result for html, if the caller already has it.
+    Returns the product dict, or None if the page couldn't be parsed.
+    """
+    try:
+        # Images, name, description, usage and ingredient text in one pass over the page
+        if page_data is None:
+            with stage(trace, 'parse'):
+                page_data = extract_page(html, product_code)
+
+        # Keep the raw page (compressed, deduplicated) for debugging and offline reparsing
+        with stage(trace, 'write'):
+            digest = save_page(product_code, html, source="product", content=content_digest(page_data))
+        print(f"📝 Saved page HTML to the page store ({digest[:12]})")
+
+        images = page_data['images']
+        name = page_data['name']
+        full_description = page_data['description']
+        using = page_data['using']
+        ingredient_text = page_data['ingredient_text']
+
+        if len(images) >= 3:  # Keep if 3 or more
+            image_value = images
         else:
-            image_value = unique_images[0] if unique_images else ''  # Fallback to single or empty
+            image_value = images[0] if images else ''  # Fallback to single or empty
         print(f"📸 Final image value: {image_value}")  # Debug log
 
         # Log to report.txt if no images found
@@ -105,46 +139,15 @@ def extract_product_details(page, url, product_code, category_id, obj):
                 f.write(f"[{timestamp}] No images found for product {product_code} at URL: {url}\n")
             print(f"❌ No images found for {product_code}, logged to {REPORT_FILE}")
 
-        # Extract description text from multiple elements
-        description = ''
-        for element in soup.find_all(['div', 'p', 'span'], class_=re.compile(r'(content ng-tns-c\d+-\d+|ng-tns-c\d+-\d+ ng-star-inserted|description|product-details)')):
-            description += element.text.strip() + '\n'
-
-        description = re.sub(r'\s+', ' ', description).strip()
-        print(f"📜 Raw description: {description[:200]}...")  # Log first 200 chars for debugging
-
-        # Split into sections using regex for keywords
-        parts = re.split(r'(วิธีการใช้งาน|ส่วนประกอบ|ส่วนผสม)', description, flags=re.IGNORECASE)
-
-        # Reassemble sections
-        desc_parts = []
-        using = ''
-        ingredient_text = ''
-        i = 0
-        while i < len(parts):
-            part = parts[i].strip()
-            if part.lower() in ['วิธีการใช้งาน']:
-                if i + 1 < len(parts):
-                    using = parts[i + 1].strip()
-                    i += 2
-                    continue
-            elif part.lower() in ['ส่วนประกอบ', 'ส่วนผสม']:
-                if i + 1 < len(parts):
-                    ingredient_text = parts[i + 1].strip()
-                    i += 2
-                    continue
-            else:
-                desc_parts.append(part)
-                i += 1
-
-        full_description = ' '.join(desc_parts).strip()
+        print(f"📜 Description: {full_description[:200]}...")  # Log first 200 chars for debugging
         print(f"📋 Ingredient text: {ingredient_text[:200]}...")  # Log for debugging
 
         # Parse ingredients
         ingredients = []
         if ingredient_text:
             # Split ingredients, preserving commas within parentheses
-            raw_ings = split_ingredients(ingredient_text)
+            with stage(trace, 'parse'):
+                raw_ings = split_ingredients(ingredient_text)
             for ing in raw_ings:
                 # Filter for English-only ingredients
                 if re.match(r'^[A-Za-z0-9\s\(\)\-\.\/]*$', ing) and not re.search(r'[ป-ฮ]', ing):
@@ -154,38 +157,26 @@ def extract_product_details(page, url, product_code, category_id, obj):
             print(f"🧪 Parsed ingredients: {ingredients}")
 
         # Map ingredients
-        ingredient_map = {ing['name'].lower(): ing['id'] for ing in obj['ingredient']}
-        next_ing_id = max(ing['id'] for ing in obj['ingredient']) + 1 if obj['ingredient'] else 1
-        ingredient_ids = []
-
-        for ing in ingredients:
-            ing_lower = ing.lower()
-            if ing_lower in ingredient_map:
-                ingredient_ids.append(ingredient_map[ing_lower])
-            else:
-                new_ing = {'id': next_ing_id, 'name': ing, 'allergic': False, 'allergic-relation': None}
-                obj['ingredient'].append(new_ing)
-                ingredient_map[ing_lower] = next_ing_id
-                ingredient_ids.append(next_ing_id)
-                next_ing_id += 1
-
-        # Add new product
-        next_prod_id = max(prod['id'] for prod in obj['product']) + 1 if obj['product'] else 1
-        new_product = {
-            'id': next_prod_id,
-            'name': name,
-            'description': full_description,
-            'using': using,
-            'image': image_value,
-            'ingredient': ingredient_ids,
-            'category': category_id,
-            'link': url
-        }
-
-        obj['product'].append(new_product)
-        print(f"✅ Added product: {name} with {len(ingredient_ids)} ingredients")
+        with stage(trace, 'ingredients'):
+            ingredient_ids = registry.ingredient_ids(ingredients)
+
+        # Add the product, or replace the one it was scraped as before
+        replaced = product_id is not None and registry.product(product_id) is not None
+        with stage(trace, 'write'):
+            new_product = registry.put_product({
+                'name': name,
+                'description': full_description,
+                'using': using,
+                'image': image_value,
+                'ingredient': ingredient_ids,
+                'category': category_id,
+                'link': url
+            }, product_id)
+        print(f"✅ {'Updated' if replaced else 'Added'} product: {name} with {len(ingredient_ids)} ingredients")
+        return new_product
     except Exception as e:
-        print(f"❌ Error scraping {url}: {e}")
+        print(f"❌ Error parsing {url}: {e}")
+        return None
 
 def main():
     # Read CSV
@@ -215,86 +206,147 @@ def main():
         'product': []
     }
 
-    with sync_playwright() as p:
+    # Incremental runs start from the previous output and only refresh what is stale or changed
+    state = load_state()
+    if INCREMENTAL and os.path.exists(OUTPUT_JSON):
+        with open(OUTPUT_JSON, 'r', encoding='utf-8') as f:
+            obj = json.load(f)
+        print(f"📂 Loaded {len(obj['product'])} products from {OUTPUT_JSON}")
+
+    def checkpoint():
+        # In database mode every product is already durable in the database (and the NDJSON stream),
+        # so only the crawl state is saved; the JSON is written once, at the end
+        if not USE_DATABASE:
+            save_to_json(snapshot())
+        save_state(state)
+
+    # Pick up an interrupted run: its last checkpoint plus everything journalled after it
+    journal = CrawlJournal(checkpoint, OUTPUT_JSON)
+    obj = journal.resume(obj, state)
+    stream = None
+    if USE_DATABASE:
+        # The database is the source of truth: every parsed product is upserted into it right away
         try:
-            print("🌐 Opening Microsoft Edge...")
-            browser = p.chromium.launch(
-                channel="msedge",
-                headless=False,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-web-security',
-                    '--disable-features=VizDisplayCompositor'
-                ]
-            )
-
-            # Load or create session
-            if os.path.exists(SESSION_FILE):
-                print("🔐 Loading saved session...")
-                context = browser.new_context(storage_state=SESSION_FILE)
+            registry = DatasetDB(db_path_for(OUTPUT_JSON), source=OUTPUT_JSON)
+            registry.seed(obj)
+        except DatasetMismatch as e:
+            print(f"❌ {e}")
+            return
+        obj = registry.export()
+        registry.canon = CanonIndex.from_dataset(obj) if CANONICALIZE else None
+        if STREAM_OUTPUT:
+            stream = registry.sink = NdjsonWriter(OUTPUT_NDJSON, obj)
+    else:
+        if STREAM_OUTPUT:
+            stream = NdjsonWriter(OUTPUT_NDJSON, obj)
+        registry = DatasetRegistry(obj, CanonIndex.from_dataset(obj) if CANONICALIZE else None, sink=stream)
+
+    def snapshot():
+        return registry.export() if USE_DATABASE else obj
+
+    existing = {p['link']: p for p in obj['product']}
+
+    # Build the crawl queue, skipping rows without a BP number and duplicates
+    jobs = []
+    skipped_fresh = 0
+    for product in products:
+        url = product['URL']
+        type_name = product['Types']
+        bp_number = extract_bp_number(url)
+        if not bp_number:
+            print(f"❌ No BP number found in URL: {url}")
+            continue
+
+        if bp_number in bp_numbers_seen:
+            duplicates.append({'bp_number': bp_number, 'url': url, 'existing_url': bp_numbers_seen[bp_number]})
+            print(f"⚠️ Duplicate BP number {bp_number} found for URL: {url}")
+            continue
+
+        bp_numbers_seen[bp_number] = url
+        if url in journal.completed:
+            continue
+        if INCREMENTAL and url in existing and is_fresh(state.get(url)):
+            skipped_fresh += 1
+            continue
+        jobs.append({'url': url, 'product_code': f"WTCTH-{bp_number}", 'category_id': map_category(type_name)})
+
+    # Serve as many products as possible over HTTP; only the rest need the browser.
+    # Each page is parsed and journalled as soon as its fetch completes.
+    if PREFER_HTTP and jobs:
+        http_session = new_http_session(SESSION_FILE)
+        browser_jobs = []
+        for job, (status, html, validators) in fetch_many(http_session, jobs, state=state):
+            trace = job.pop('trace')  # Started by the fetch, so the URL's total covers it
+            if status == 'not-modified' and job['url'] in existing:
+                mark_unchanged(state, job['url'])
+                with trace.stage('write'):
+                    journal.record(job['url'], 'unchanged', state=state[job['url']])
+                trace.finish('not-modified')
+            elif status == 'ok':
+                trace.finish(process_fetched_page(html, job, registry, state, existing, journal, validators, trace))
             else:
-                print("🔑 No session found. Creating new session with manual login...")
-                context = browser.new_context()
-                page = context.new_page()
-                page.goto("https://www.watsons.co.th/th/login")
-                print("⏳ Please log in manually in the browser window...")
-                print("👉 After successful login, press Enter here to continue and save the session...")
-                input()
-                try:
-                    page.wait_for_url("**/watsons.co.th/**", timeout=10000)
-                    context.storage_state(path=SESSION_FILE)
-                    print(f"✅ Session saved to {SESSION_FILE}")
-                except Exception as e:
-                    print(f"❌ Login verification failed: {e}. Please try again.")
-                    browser.close()
-                    exit()
-
-            # Set up new page
-            page = context.new_page()
-            page.set_extra_http_headers({
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0"
-            })
-
-            # Process each product
-            for product in products:
-                url = product['URL']
-                type_name = product['Types']
-                bp_number = extract_bp_number(url)
-                if not bp_number:
-                    print(f"❌ No BP number found in URL: {url}")
-                    continue
-
-                product_code = f"WTCTH-{bp_number}"
-                if bp_number in bp_numbers_seen:
-                    duplicates.append({'bp_number': bp_number, 'url': url, 'existing_url': bp_numbers_seen[bp_number]})
-                    print(f"⚠️ Duplicate BP number {bp_number} found for URL: {url}")
-                    continue
-
-                bp_numbers_seen[bp_number] = url
-                category_id = map_category(type_name)
-                extract_product_details(page, url, product_code, category_id, obj)
-
-            # Save to JSON
+                # The browser finishes this trace, so the URL still gets one event (its fetch stage is the HTTP try)
+                trace.source = 'browser'
+                job['trace'] = trace
+                browser_jobs.append(job)
+        jobs = browser_jobs
+
+    async def handle(page, job):
+        trace = job.pop('trace', None) or Trace(job['url'])
+        try:
+            html = await render_page_async(page, job['url'], job['product_code'], trace)
+        except TransientNavigationError:
+            trace.finish('requeued')
+            raise
+        if not html:
+            trace.finish('failed')
+            return
+        trace.finish(process_fetched_page(html, job, registry, state, existing, journal, trace=trace))
+
+    blocking_stats = new_blocking_stats()
+
+    async def setup_context(context):
+        if BLOCK_RESOURCES:
+            await block_resources_async(context, blocking_stats)
+
+    try:
+        asyncio.run(run_crawl(jobs, handle, concurrency=CONCURRENCY, contexts=CONTEXTS,
+                              per_host=PER_HOST_LIMIT, session_file=SESSION_FILE,
+                              on_context=setup_context))
+
+        # Save to JSON
+        obj = snapshot()
+        if stream is not None:
+            # The stream holds every row in the order they were stored, so compacting it gives the same JSON
+            stream.close()
+            compact(OUTPUT_NDJSON, OUTPUT_JSON)
+            print(f"✅ Saved data to {OUTPUT_JSON}")
+        else:
             save_to_json(obj)
-            print("🎉 Processed all product pages!")
-
-            # Log duplicates
-            if duplicates:
-                print("⚠️ Duplicates found:")
-                for dup in duplicates:
-                    print(f"BP_{dup['bp_number']}: {dup['url']} (already processed as {dup['existing_url']})")
-
-        except Exception as e:
-            print(f"❌ Error: {e}")
-            if "Executable doesn't exist" in str(e):
-                print("Please run 'playwright install' to install required browser binaries.")
-        finally:
-            print("⏳ Waiting 5 seconds before closing...")
-            time.sleep(5)
-            try:
-                browser.close()
-            except:
-                pass
+        if USE_DATABASE:
+            registry.mark_synced()
+        write_columnar(obj, OUTPUT_COLUMNAR)
+        save_state(state)
+        journal.finish()
+        print("🎉 Processed all product pages!")
+        if skipped_fresh:
+            print(f"⏭️ Skipped {skipped_fresh} products refreshed within the last {MIN_REFRESH_AGE}")
+        print_ready_summary()
+        print_blocking_summary(blocking_stats)
+        print_fetch_summary()
+        print_navigation_summary()
+        print_telemetry_summary()
+
+        # Log duplicates
+        if duplicates:
+            print("⚠️ Duplicates found:")
+            for dup in duplicates:
+                print(f"BP_{dup['bp_number']}: {dup['url']} (already processed as {dup['existing_url']})")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        if "Executable doesn't exist" in str(e):
+            print("Please run 'playwright install' to install required browser binaries.")
 
     print("👋 Program finished.")
 
@@ -0,0 +1,128 @@
+from crawl_engine import run_crawl, CONCURRENCY, CONTEXTS, PER_HOST_LIMIT
+from resource_blocking import BLOCK_RESOURCES, block_resources_async, new_blocking_stats, print_blocking_summary
+from navigation import goto_async, print_navigation_summary
+from bulk_extract import print_bulk_summary
+from link_discovery import SEARCHES, BASE_URL, QUEUE_CSV, CrawlQueue, discover_links, load_searches, search_url
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+import asyncio
+import sys
+import time
+
+SESSION_FILE = "watsons_session.json"
+SEARCH_API_MARK = "/products/search"  # Path of the OCC search endpoint the search page calls
+CAPTURE_TIMEOUT = 15  # Seconds to wait for the page's own search request
+PAGE_SIZE = 100  # Results per API page (the page itself asks for far fewer)
+API_CONCURRENCY = 4  # API pages fetched at the same time per search
+
+# The search page loads its results from the shop's OCC API, e.g.
+#   /api/v2/wtcth/products/search?query=...&currentPage=0&pageSize=24&fields=...
+# which answers {"products": [{"code": "BP_139729", "url": "/th/.../p/BP_139729", ...}],
+#               "pagination": {"currentPage": 0, "totalPages": 12, "totalResults": 283, ...}}
+# Capturing that request once gives the exact URL (site id, fields, sort) to page through.
+
+API_STATS = {'searches': 0, 'api_pages': 0, 'dom_fallbacks': 0}
+
+def page_url(api_url, current_page, page_size=PAGE_SIZE):
+    """The captured search API URL asking for another page."""
+    parts = urlparse(api_url)
+    query = parse_qs(parts.query, keep_blank_values=True)
+    query['currentPage'] = [str(current_page)]
+    query['pageSize'] = [str(page_size)]
+    return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+
+def product_links(results):
+    """(product code, absolute URL) of every product in one API page."""
+    links = []
+    for product in results.get('products', []):
+        url = product.get('url')
+        if url:
+            links.append((product.get('code'), BASE_URL + url if url.startswith('/') else url))
+    return links
+
+async def capture_search_request(page, url):
+    """Open a search page and return the URL of the search API call it makes, or None."""
+    captured = asyncio.get_running_loop().create_future()
+
+    def on_response(response):
+        if SEARCH_API_MARK in response.url and response.ok and not captured.done():
+            captured.set_result(response.url)
+
+    page.on('response', on_response)
+    try:
+        await goto_async(page, url, timeout=30000, wait_until='domcontentloaded')
+        return await asyncio.wait_for(captured, CAPTURE_TIMEOUT)
+    except asyncio.TimeoutError:
+        return None
+    finally:
+        page.remove_listener('response', on_response)
+
+async def fetch_results(request, api_url, current_page):
+    response = await request.get(page_url(api_url, current_page))
+    if not response.ok:
+        raise RuntimeError(f"search API returned {response.status} for page {current_page}")
+    API_STATS['api_pages'] += 1
+    return await response.json()
+
+async def harvest(page, url):
+    """Every product link of one search, read from the search API rather than the rendered page.
+
+    The API calls go through the page's context (page.request), so they carry
+    the session cookies without rendering anything. Falls back to scrolling the
+    page when no API call is seen.
+    """
+    API_STATS['searches'] += 1
+    api_url = await capture_search_request(page, url)
+    if api_url is None:
+        print(f"⚠️ No search API call seen on {url}, scrolling the page instead")
+        API_STATS['dom_fallbacks'] += 1
+        return await discover_links(page, url)
+
+    first = await fetch_results(page.request, api_url, 0)
+    total_pages = first.get('pagination', {}).get('totalPages', 1)
+    semaphore = asyncio.Semaphore(API_CONCURRENCY)
+
+    async def fetch(current_page):
+        async with semaphore:
+            return await fetch_results(page.request, api_url, current_page)
+
+    pages = [first] + await asyncio.gather(*(fetch(n) for n in range(1, total_pages)))
+    links = dict(link for results in pages for link in product_links(results))
+    print(f"🔍 {len(links)} products from {total_pages} API page(s) for {url}")
+    return list(links.values())
+
+def main():
+    searches = load_searches(sys.argv[1]) if len(sys.argv) > 1 else SEARCHES
+    queue = CrawlQueue()
+    jobs = [{'url': search_url(query), 'types': types} for query, types in searches]
+    found = {'links': 0, 'new': 0}
+
+    async def handle(page, job):
+        links = await harvest(page, job['url'])
+        added = queue.add(links, job['types'])
+        found['links'] += len(links)
+        found['new'] += added
+        print(f"✅ {job['types']}: {added} new of {len(links)} links queued")
+
+    blocking_stats = new_blocking_stats()
+
+    async def setup_context(context):
+        if BLOCK_RESOURCES:
+            await block_resources_async(context, blocking_stats)
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(run_crawl(jobs, handle, concurrency=CONCURRENCY, contexts=CONTEXTS,
+                              per_host=PER_HOST_LIMIT, session_file=SESSION_FILE,
+                              on_context=setup_context))
+    finally:
+        queue.close()
+    print(f"🎉 {found['new']} new product links added to {QUEUE_CSV} "
+          f"({found['links']} found over {len(jobs)} searches in {time.perf_counter() - start:.1f}s)")
+    print(f"📡 {API_STATS['api_pages']} search API pages read, "
+          f"{API_STATS['dom_fallbacks']}/{API_STATS['searches']} searches fell back to scrolling")
+    print_blocking_summary(blocking_stats)
+    print_bulk_summary()
+    print_navigation_summary()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+import json
+import math
+import sys
+import time
+
+TELEMETRY = True  # Write one structured event per crawled URL to TELEMETRY_FILE
+TELEMETRY_FILE = "crawl_telemetry.jsonl"
+STAGES = ('fetch', 'navigate', 'ready', 'serialize', 'parse', 'ingredients', 'write')
+
+# One line per URL:
+#   {"ts": "...", "url": "...", "source": "browser", "outcome": "parsed", "total": 4.21,
+#    "stages": {"navigate": 1.9, "ready": 1.2, "serialize": 0.05, "parse": 0.03, ...},
+#    "bytes_received": 412345, "retries": 0}
+# bytes_received is what went over the wire for the URL: the HTTP response body, or the sum of the
+# responses the browser page received while loading it (as their Content-Length declares).
+# Outcomes: parsed, unchanged, not-modified, no-product, failed, requeued.
+
+STAGE_TIMES = {}  # stage -> [seconds, ...] for this run
+TOTAL_TIMES = []
+OUTCOMES = {}
+RUN_STATS = {'bytes_received': 0, 'retries': 0}
+_file = None
+
+class Trace:
+    """Timings and counters for one URL, written as a single event when it finishes."""
+
+    def __init__(self, url, source='browser'):
+        self.url = url
+        self.source = source
+        self.stages = {}
+        self.bytes_received = 0
+        self.retries = 0
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def add(self, name, seconds):
+        """Count time measured elsewhere (e.g. in a worker thread) under a stage."""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def finish(self, outcome, **fields):
+        total = time.perf_counter() - self.start
+        for name, seconds in self.stages.items():
+            STAGE_TIMES.setdefault(name, []).append(seconds)
+        TOTAL_TIMES.append(total)
+        OUTCOMES[outcome] = OUTCOMES.get(outcome, 0) + 1
+        RUN_STATS['bytes_received'] += self.bytes_received
+        RUN_STATS['retries'] += self.retries
+        if TELEMETRY:
+            _write({'ts': datetime.now().isoformat(timespec='seconds'), 'url': self.url, 'source': self.source,
+                    'outcome': outcome, 'total': round(total, 4),
+                    'stages': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+                    'bytes_received': self.bytes_received, 'retries': self.retries, **fields})
+
+def stage(trace, name):
+    """trace.stage(name), or a no-op when there is no trace."""
+    return trace.stage(name) if trace is not None else nullcontext()
+
+def _write(event):
+    global _file
+    if _file is None:
+        _file = open(TELEMETRY_FILE, 'a', encoding='utf-8')
+    _file.write(json.dumps(event, ensure_ascii=False) + '\n')
+    _file.flush()
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+def print_telemetry_summary(stage_times=None, total_times=None, outcomes=None, run_stats=None):
+    stage_times = STAGE_TIMES if stage_times is None else stage_times
+    total_times = TOTAL_TIMES if total_times is None else total_times
+    outcomes = OUTCOMES if outcomes is None else outcomes
+    run_stats = RUN_STATS if run_stats is None else run_stats
+    if not total_times:
+        return
+    spent = sum(sum(times) for times in stage_times.values()) or 1
+    print(f"⏱️ Stage timings over {len(total_times)} URLs (seconds):")
+    print(f"   {'stage':<12}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'total':>10}{'share':>8}")
+    order = [name for name in STAGES if name in stage_times] + sorted(set(stage_times) - set(STAGES))
+    for name in order:
+        times = stage_times[name]
+        print(f"   {name:<12}{len(times):>7}{percentile(times, 50):>9.3f}{percentile(times, 95):>9.3f}"
+              f"{percentile(times, 99):>9.3f}{sum(times):>10.1f}{sum(times) / spent:>8.0%}")
+    print(f"   {'per URL':<12}{len(total_times):>7}{percentile(total_times, 50):>9.3f}"
+          f"{percentile(total_times, 95):>9.3f}{percentile(total_times, 99):>9.3f}{sum(total_times):>10.1f}")
+    print(f"📊 Outcomes: {', '.join(f'{n} {outcome}' for outcome, n in sorted(outcomes.items()))}; "
+          f"{run_stats['bytes_received'] / 1024 / 1024:.1f} MB received, {run_stats['retries']} retries")
+
+def summarize_file(path=TELEMETRY_FILE):
+    """Print the summary for every event in a telemetry file (several runs accumulate in one)."""
+    stage_times, total_times, outcomes, run_stats = {}, [], {}, {'bytes_received': 0, 'retries': 0}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            event = json.loads(line)
+            for name, seconds in event['stages'].items():
+                stage_times.setdefault(name, []).append(seconds)
+            total_times.append(event['total'])
+            outcomes[event['outcome']] = outcomes.get(event['outcome'], 0) + 1
+            run_stats['bytes_received'] += event.get('bytes_received', 0)
+            run_stats['retries'] += event.get('retries', 0)
+    print_telemetry_summary(stage_times, total_times, outcomes, run_stats)
+
+if __name__ == "__main__":
+    summarize_file(sys.argv[1] if len(sys.argv) > 1 else TELEMETRY_FILE)
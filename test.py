@@ -1,6 +1,9 @@
 from playwright.sync_api import sync_playwright
 import time, os, csv
 import requests  # Added for optional link validation
+from bulk_extract import collect, print_bulk_summary
+from browser_pool import open_context
+from navigation import goto, print_navigation_summary
 
 TARGET_URL = "https://www.watsons.co.th/th/search?text=%E0%B8%A2%E0%B8%B2%E0%B8%AA%E0%B8%A3%E0%B8%B0%E0%B8%9C%E0%B8%A1&useDefaultSearch=false&brandRedirect=true"
 SESSION_FILE = "watsons_session.json"
@@ -46,25 +49,22 @@ def scrape_product_links(page):
     
     try:
         page.wait_for_selector(link_selector, timeout=10000)
-        elements = page.query_selector_all(link_selector)
-        print(f"✅ Found {len(elements)} potential product links")
+        # One evaluate for every href instead of a get_attribute round trip per element
+        rows = collect(page, link_selector, spec={'href': 'href'})
+        print(f"✅ Found {len(rows)} potential product links")
         
-        for elem in elements:
-            try:
-                href = elem.get_attribute('href')
-                if href:
-                    # Make full URL if relative
-                    if href.startswith('/'):
-                        full_url = base_url + href
-                    else:
-                        full_url = href
-                    if validate_url(full_url):
-                        links.append(full_url)
-                    else:
-                        print(f"⚠️ Skipped invalid URL: {full_url}")
-            except Exception as e:
-                print(f"❌ Error processing link: {str(e)[:50]}")
-                continue
+        for row in rows:
+            href = row['href']
+            if href:
+                # Make full URL if relative
+                if href.startswith('/'):
+                    full_url = base_url + href
+                else:
+                    full_url = href
+                if validate_url(full_url):
+                    links.append(full_url)
+                else:
+                    print(f"⚠️ Skipped invalid URL: {full_url}")
     except Exception as e:
         print(f"❌ Error finding links: {str(e)[:50]}")
     
@@ -77,38 +77,8 @@ def scrape_product_links(page):
 
 with sync_playwright() as p:
     try:
-        print("🌐 Opening Microsoft Edge...")
-        browser = p.chromium.launch(
-            channel="msedge",
-            headless=False,  # Set to True for background running
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor'
-            ]
-        )
-        
-        # Load or create session
-        if os.path.exists(SESSION_FILE):
-            print("🔐 Loading saved session...")
-            context = browser.new_context(storage_state=SESSION_FILE)
-        else:
-            print("🔑 No session found. Creating new session with manual login...")
-            context = browser.new_context()
-            page = context.new_page()
-            page.goto("https://www.watsons.co.th/th/login")
-            print("⏳ Please log in manually in the browser window...")
-            print("👉 After successful login, press Enter here to continue and save the session...")
-            input()  # Wait for user input after manual login
-            try:
-                # Verify we're on the main site after login
-                page.wait_for_url("**/watsons.co.th/**", timeout=10000)
-                context.storage_state(path=SESSION_FILE)
-                print(f"✅ Session saved to {SESSION_FILE}")
-            except Exception as e:
-                print(f"❌ Login verification failed: {e}. Please try again.")
-                browser.close()
-                exit()
+        # Reuse the pooled browser and saved login
+        browser, context = open_context(p, SESSION_FILE)
         
         # Set up new page and headers
         page = context.new_page()
@@ -117,7 +87,7 @@ with sync_playwright() as p:
         })
         
         print(f"📄 Navigating to: {TARGET_URL}")
-        page.goto(TARGET_URL)
+        goto(page, TARGET_URL)
         print("⏳ Waiting for page content to load...")
         page.wait_for_load_state('domcontentloaded', timeout=15000)
         time.sleep(2)  # Brief delay for JavaScript rendering
@@ -150,6 +120,8 @@ with sync_playwright() as p:
             print("❌ No links scraped. Inspect the page manually to verify selectors.")
         
         print(f"🛒 View results in: {OUTPUT_CSV}")
+        print_bulk_summary()
+        print_navigation_summary()
     
     except Exception as e:
         print(f"❌ Error: {e}")